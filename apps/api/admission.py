@@ -0,0 +1,159 @@
+"""
+Control de admisión y descarte de carga por worker.
+
+Middleware WSGI que cuenta las peticiones en curso y mide cuánto esperó cada
+una en cola antes de llegar al worker (cabecera X-Request-Start / X-Queue-Start
+del proxy). Cuando el worker está saturado responde 503 con Retry-After de
+inmediato, en lugar de hacer trabajo que el cliente ya no va a esperar.
+
+Prioridades:
+  - high: siempre se admite (health, verificación de email)
+  - normal: se descarta si hay demasiadas en curso o la espera en cola es alta
+  - low: se descarta antes, con la mitad de los límites (exports, analítica)
+Las rutas de streaming (SSE) no cuentan como peticiones en curso.
+"""
+
+import json
+import threading
+import time
+from collections import Counter
+
+
+def parse_request_start(value: str):
+    """Marca de tiempo del proxy en segundos ('t=1700000000123456', ms, µs o s)"""
+    if not value:
+        return None
+    try:
+        stamp = float(value.strip().replace('t=', ''))
+    except ValueError:
+        return None
+    if stamp > 1e14:
+        return stamp / 1e6
+    if stamp > 1e11:
+        return stamp / 1e3
+    return stamp
+
+
+class AdmissionController:
+    """Middleware WSGI de admisión por prioridad"""
+
+    def __init__(self, wsgi_app, max_in_flight: int = 32, max_queue_ms: float = 2000,
+                 high_paths=(), low_paths=(), stream_paths=(), retry_after: int = 2,
+                 allowed_origins=()):
+        self.wsgi_app = wsgi_app
+        self.max_in_flight = max_in_flight
+        self.max_queue_ms = max_queue_ms
+        self.high_paths = tuple(high_paths)
+        self.low_paths = tuple(low_paths)
+        self.stream_paths = tuple(stream_paths)
+        self.retry_after = retry_after
+        self.allowed_origins = set(allowed_origins)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.max_queue_ms_seen = 0.0
+        self.admitted = Counter()
+        self.shed = Counter()
+
+    def priority(self, path: str) -> str:
+        if path.startswith(self.high_paths):
+            return 'high'
+        if path.startswith(self.low_paths):
+            return 'low'
+        return 'normal'
+
+    def _shed_reason(self, priority: str, queue_ms) -> str:
+        """Motivo para descartar la petición, o None si se admite"""
+        if priority == 'high':
+            return None
+        factor = 0.5 if priority == 'low' else 1.0
+        if queue_ms is not None and queue_ms > self.max_queue_ms * factor:
+            return 'queue_age'
+        if self.in_flight >= self.max_in_flight * factor:
+            return 'in_flight'
+        return None
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.stream_paths):
+            return self.wsgi_app(environ, start_response)
+
+        request_start = parse_request_start(environ.get('HTTP_X_REQUEST_START') or environ.get('HTTP_X_QUEUE_START'))
+        queue_ms = max(0.0, (time.time() - request_start) * 1000) if request_start else None
+        priority = self.priority(path)
+
+        with self._lock:
+            if queue_ms is not None:
+                self.max_queue_ms_seen = max(self.max_queue_ms_seen, queue_ms)
+            reason = self._shed_reason(priority, queue_ms)
+            if reason is None:
+                self.in_flight += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                self.admitted[priority] += 1
+            else:
+                self.shed[f'{priority}:{reason}'] += 1
+
+        if reason is not None:
+            return self._reject(environ, start_response)
+
+        try:
+            response = self.wsgi_app(environ, start_response)
+        except BaseException:
+            self._release()
+            raise
+        return _ReleasingIterable(response, self._release)
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _reject(self, environ, start_response):
+        body = json.dumps({
+            'error': 'Service overloaded',
+            'message': 'Servidor ocupado, intenta de nuevo en unos segundos'
+        }).encode('utf-8')
+        headers = [
+            ('Content-Type', 'application/json'),
+            ('Content-Length', str(len(body))),
+            ('Retry-After', str(self.retry_after))
+        ]
+        # Flask-CORS no llega a ejecutarse; sin esto el navegador no puede leer el 503
+        origin = environ.get('HTTP_ORIGIN')
+        if origin and origin in self.allowed_origins:
+            headers += [('Access-Control-Allow-Origin', origin), ('Vary', 'Origin')]
+        start_response('503 Service Unavailable', headers)
+        return [body]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'max_in_flight': self.max_in_flight,
+                'max_queue_ms': self.max_queue_ms,
+                'max_queue_ms_seen': round(self.max_queue_ms_seen, 1),
+                'admitted': dict(self.admitted),
+                'shed': dict(self.shed),
+                'shed_total': sum(self.shed.values())
+            }
+
+
+class _ReleasingIterable:
+    """Libera el cupo cuando el servidor termina de enviar la respuesta"""
+
+    def __init__(self, iterable, release):
+        self._iterable = iterable
+        self._release = release
+        self._released = False
+
+    def __iter__(self):
+        return iter(self._iterable)
+
+    def close(self):
+        try:
+            if hasattr(self._iterable, 'close'):
+                self._iterable.close()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark de serialización JSON de respuestas
+
+Compara el proveedor por defecto de Flask con OrjsonProvider sobre cargas
+parecidas a las reales: la lista de actividades con el usuario creador
+embebido y la lista de posts con comentarios embebidos.
+
+Uso:
+    python benchmark_json.py --activities 500 --posts 200 --repeat 20
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from json_provider import OrjsonProvider, orjson
+
+def activity_payload(count: int) -> list:
+    """Como GET /api/volunteer-activities (con users embebido)"""
+    organizers = [{
+        'id': str(uuid.uuid4()),
+        'first_name': f'Organizador{i}',
+        'last_name': 'Hernández',
+        'email': f'organizador{i}@ejemplo.com',
+        'avatar_url': f'https://lh3.googleusercontent.com/a/avatar{i}'
+    } for i in range(25)]
+    start = datetime(2024, 11, 1)
+    return [{
+        'id': str(uuid.uuid4()),
+        'title': f'Jornada de reforestación #{i}',
+        'description': 'Plantaremos árboles nativos en la cuenca del río junto a la comunidad.',
+        'detailed_description': 'Traer agua, gorra y bloqueador. ' * 8,
+        'created_by': organizers[i % 25]['id'],
+        'location': 'San Juan Sacatepéquez, Guatemala',
+        'start_date': (start + timedelta(days=i)).isoformat(),
+        'end_date': (start + timedelta(days=i, hours=6)).isoformat(),
+        'max_participants': 20,
+        'image_url': 'https://images.unsplash.com/photo-1542601906990-b4d3fb778b09',
+        'requirements': ['Mayor de 16 años', 'Ropa cómoda', 'Botas'],
+        'benefits': ['Certificado de voluntariado', 'Refacción'],
+        'status': 'active',
+        'created_at': (start - timedelta(hours=i)).isoformat(),
+        'users': organizers[i % 25]
+    } for i in range(count)]
+
+def normalized_activity_payload(count: int) -> dict:
+    """Como GET /api/volunteer-activities?shape=normalized (usuarios en un mapa)"""
+    activities = activity_payload(count)
+    users = {activity['users']['id']: activity['users'] for activity in activities}
+    return {
+        'activities': [{k: v for k, v in activity.items() if k != 'users'} for activity in activities],
+        'users': users
+    }
+
+def posts_payload(count: int, comments_per_post: int = 8, likes_per_post: int = 30) -> dict:
+    """Como GET /api/posts (con comentarios y likes embebidos)"""
+    posts = [{
+        'id': i,
+        'title': f'¡Nuevas becas disponibles! ({i})',
+        'content': 'Hemos abierto la convocatoria para nuevas becas educativas. Aplica ya! ' * 3,
+        'author_id': i % 10,
+        'author': 'Administrador CASIRA',
+        'created_at': '2024-11-15',
+        'likes_count': likes_per_post,
+        'comments_count': comments_per_post,
+        'comments': [{
+            'id': i * 100 + j,
+            'post_id': i,
+            'author_id': j,
+            'author': 'María González',
+            'content': '¡Excelente iniciativa! Compartiendo con estudiantes necesitados.',
+            'created_at': '2024-11-16',
+            'likes_count': j
+        } for j in range(comments_per_post)],
+        'likes': [{'user_id': k, 'created_at': '2024-11-15'} for k in range(likes_per_post)]
+    } for i in range(count)]
+    return {'posts': posts, 'total': len(posts)}
+
+def measure(app: Flask, payload, repeat: int) -> dict:
+    """Tiempo de app.json.response(payload) (serialización + Response)"""
+    timings = []
+    with app.app_context():
+        size = len(app.json.response(payload).get_data())
+        for _ in range(repeat):
+            started = time.perf_counter()
+            app.json.response(payload)
+            timings.append((time.perf_counter() - started) * 1000)
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings), 'bytes': size}
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Benchmark de proveedores JSON')
+    parser.add_argument('--activities', type=int, default=500, help='Actividades en la lista (por defecto 500)')
+    parser.add_argument('--posts', type=int, default=200, help='Posts en la lista (por defecto 200)')
+    parser.add_argument('--repeat', type=int, default=20, help='Repeticiones por caso (por defecto 20)')
+    args = parser.parse_args()
+
+    payloads = {
+        f'activities x{args.activities}': activity_payload(args.activities),
+        f'normalized x{args.activities}': normalized_activity_payload(args.activities),
+        f'posts x{args.posts}': posts_payload(args.posts)
+    }
+    providers = {'default': DefaultJSONProvider}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider
+    else:
+        print("[WARN] orjson no está instalado; solo se mide el proveedor por defecto")
+
+    print(f"{'payload':<20} {'provider':<10} {'median ms':>10} {'min ms':>10} {'bytes':>10} {'speedup':>8}")
+    for name, payload in payloads.items():
+        baseline = None
+        for provider_name, provider_class in providers.items():
+            app = Flask(__name__)
+            app.json = provider_class(app)
+            result = measure(app, payload, args.repeat)
+            baseline = baseline or result['median_ms']
+            print(f"{name:<20} {provider_name:<10} {result['median_ms']:>10.2f} {result['min_ms']:>10.2f} "
+                  f"{result['bytes']:>10} {baseline / result['median_ms']:>7.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
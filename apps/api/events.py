@@ -0,0 +1,172 @@
+"""
+Pub/sub en proceso para Server-Sent Events.
+
+Los handlers publican eventos por tópico ('feed', 'post:<id>',
+'activity:<id>:requests') y cada cliente SSE recibe los de sus tópicos.
+Con varios workers se puede activar un broker local sobre SQLite: cada
+worker escribe sus eventos en una tabla compartida y un hilo los reparte
+a los suscriptores de su propio proceso.
+"""
+
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+HEARTBEAT_SECONDS = 15
+
+
+class Subscription:
+    """Cola de eventos de un cliente SSE"""
+
+    def __init__(self, topics: set, maxsize: int = 256):
+        self.topics = topics
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def offer(self, event: dict):
+        """Encolar sin bloquear; si el cliente va atrasado se descarta el evento"""
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            pass
+
+
+class EventBus:
+    """Reparte eventos a los suscriptores de este proceso"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._broker = None
+        self._next_id = 0
+        self.published = Counter()
+
+    def attach_broker(self, broker):
+        """Usar un broker compartido entre workers en lugar del reparto local"""
+        self._broker = broker
+        broker.start(self._deliver)
+
+    def subscribe(self, topics) -> Subscription:
+        subscription = Subscription(set(topics))
+        if self._broker is not None:
+            self._broker.ensure_running()
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, topic: str, event_type: str, data: dict):
+        self.published[event_type] += 1
+        if self._broker is not None:
+            self._broker.publish(topic, event_type, data)
+            return
+        with self._lock:
+            self._next_id += 1
+            event_id = self._next_id
+        self._deliver({'id': event_id, 'topic': topic, 'type': event_type, 'data': data})
+
+    def _deliver(self, event: dict):
+        with self._lock:
+            targets = [s for s in self._subscriptions if event['topic'] in s.topics]
+        for subscription in targets:
+            subscription.offer(event)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscriptions)
+
+    def stream(self, subscription: Subscription):
+        """Generador de texto SSE; envía un comentario de heartbeat si no hay eventos"""
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = subscription.queue.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                yield format_sse(event)
+        finally:
+            self.unsubscribe(subscription)
+
+
+def format_sse(event: dict) -> str:
+    payload = json.dumps({'topic': event['topic'], **event['data']}, default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+class SQLiteEventBroker:
+    """Broker local entre workers: tabla de eventos en un archivo SQLite compartido"""
+
+    def __init__(self, path: str, poll_interval: float = 0.25, retention_seconds: int = 300):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self._local = threading.local()
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        conn = self._connection()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS events ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, type TEXT NOT NULL, '
+            'data TEXT NOT NULL, created_at REAL NOT NULL)')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def publish(self, topic: str, event_type: str, data: dict):
+        self._connection().execute(
+            'INSERT INTO events (topic, type, data, created_at) VALUES (?, ?, ?, ?)',
+            (topic, event_type, json.dumps(data, default=str), time.time()))
+
+    def start(self, deliver):
+        """Arrancar el hilo que reparte eventos nuevos (uno por proceso)"""
+        self._deliver = deliver
+        self.ensure_running()
+
+    def ensure_running(self):
+        """Relanzar el hilo si no existe en este proceso (p. ej. tras el fork)"""
+        if self._running():
+            return
+        # Dos suscriptores simultáneos no deben arrancar dos hilos (cada evento llegaría dos veces)
+        with self._start_lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._relay, name='sse-broker', daemon=True)
+            self._thread.start()
+
+    def _running(self) -> bool:
+        return self._pid == os.getpid() and self._thread is not None and self._thread.is_alive()
+
+    def _relay(self):
+        conn = self._connection()
+        last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM events').fetchone()[0]
+        last_prune = time.time()
+        while True:
+            try:
+                rows = conn.execute(
+                    'SELECT id, topic, type, data FROM events WHERE id > ? ORDER BY id', (last_id,)).fetchall()
+                for event_id, topic, event_type, data in rows:
+                    last_id = event_id
+                    self._deliver({'id': event_id, 'topic': topic, 'type': event_type, 'data': json.loads(data)})
+                if time.time() - last_prune > self.retention_seconds:
+                    conn.execute('DELETE FROM events WHERE created_at < ?', (time.time() - self.retention_seconds,))
+                    last_prune = time.time()
+            except sqlite3.Error as e:
+                print(f"[ERROR] SSE broker error: {str(e)}")
+            time.sleep(self.poll_interval)
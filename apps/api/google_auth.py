@@ -0,0 +1,144 @@
+"""
+Verificación local de ID tokens de Google (Sign in with Google).
+
+La firma RS256 del token se comprueba contra el conjunto de claves públicas
+(JWKS) de Google guardado en memoria; solo se vuelve a descargar cuando vence
+según su Cache-Control o cuando llega un token firmado con una clave (kid)
+desconocida, como máximo una vez por min_refresh_interval. Así un login con
+Google no hace ninguna llamada externa en el caso normal.
+
+La fuente de claves es intercambiable: cualquier objeto con
+fetch() -> (jwks, max_age) sirve; HTTPKeySource descarga el JWKS de Google y
+FileKeySource lee un archivo local (tests y desarrollo sin red).
+"""
+
+import json
+import re
+import threading
+import time
+
+import httpx
+import jwt
+
+GOOGLE_JWKS_URL = 'https://www.googleapis.com/oauth2/v3/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+class GoogleTokenError(Exception):
+    """El ID token no es válido (firma, audiencia, emisor, expiración o formato)"""
+
+
+class HTTPKeySource:
+    """JWKS publicado por Google; la vigencia sale de Cache-Control"""
+
+    def __init__(self, url: str = GOOGLE_JWKS_URL, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self) -> tuple:
+        response = httpx.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        match = MAX_AGE_PATTERN.search(response.headers.get('Cache-Control', ''))
+        return response.json(), int(match.group(1)) if match else None
+
+
+class FileKeySource:
+    """JWKS en un archivo local"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def fetch(self) -> tuple:
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f), None
+
+
+class JWKSCache:
+    """Claves públicas por kid, refrescadas al vencer o ante un kid desconocido"""
+
+    def __init__(self, source, default_ttl: float = 3600, min_refresh_interval: float = 60):
+        self.source = source
+        self.default_ttl = default_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._lock = threading.Lock()
+        self._keys = {}
+        self._expires_at = 0.0
+        self._fetched_at = None
+        self.refreshes = 0
+        self.failures = 0
+
+    def _refresh(self, now: float):
+        jwks, max_age = self.source.fetch()
+        keys = {}
+        for jwk in jwks.get('keys', []):
+            if jwk.get('kid') and jwk.get('kty') == 'RSA':
+                keys[jwk['kid']] = jwt.PyJWK(jwk, algorithm='RS256').key
+        self._keys = keys
+        self._fetched_at = now
+        self._expires_at = now + (max_age if max_age is not None else self.default_ttl)
+        self.refreshes += 1
+
+    def get(self, kid: str):
+        """Clave pública para kid, o None si Google no la publica"""
+        with self._lock:
+            now = time.monotonic()
+            expired = now >= self._expires_at
+            unknown = kid not in self._keys and (
+                self._fetched_at is None or now - self._fetched_at >= self.min_refresh_interval)
+            if expired or unknown:
+                try:
+                    self._refresh(now)
+                except Exception as e:
+                    if not self._keys:
+                        raise
+                    # Seguir con las claves guardadas si Google no responde y no
+                    # reintentar hasta min_refresh_interval (cada intento retiene el lock)
+                    self._fetched_at = now
+                    self._expires_at = now + self.min_refresh_interval
+                    self.failures += 1
+                    print(f"[WARN] Error refreshing Google JWKS, using cached keys: {str(e)}")
+            return self._keys.get(kid)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'keys': len(self._keys),
+                'refreshes': self.refreshes,
+                'failures': self.failures,
+                'expires_in': round(max(0.0, self._expires_at - time.monotonic()), 1)
+            }
+
+
+class GoogleTokenVerifier:
+    """Valida un ID token de Google y devuelve sus claims"""
+
+    def __init__(self, client_ids, keys: JWKSCache, leeway: float = 60):
+        self.client_ids = [client_id for client_id in client_ids if client_id]
+        self.keys = keys
+        self.leeway = leeway
+
+    def verify(self, token: str) -> dict:
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise GoogleTokenError(f'Malformed token: {str(e)}')
+        if header.get('alg') != 'RS256':
+            raise GoogleTokenError(f"Unexpected algorithm: {header.get('alg')}")
+
+        key = self.keys.get(header.get('kid'))
+        if key is None:
+            raise GoogleTokenError('Unknown signing key')
+
+        try:
+            claims = jwt.decode(token, key, algorithms=['RS256'], audience=self.client_ids,
+                                leeway=self.leeway, options={'require': ['exp', 'iat', 'iss', 'aud', 'sub']})
+        except jwt.InvalidTokenError as e:
+            raise GoogleTokenError(str(e))
+
+        if claims['iss'] not in GOOGLE_ISSUERS:
+            raise GoogleTokenError(f"Unexpected issuer: {claims['iss']}")
+        if not claims.get('email') or not claims.get('email_verified'):
+            raise GoogleTokenError('Email not verified')
+        return claims
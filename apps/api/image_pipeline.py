@@ -0,0 +1,152 @@
+"""
+Subida de imágenes de actividades y generación de miniaturas fuera del request.
+
+El endpoint de subida guarda el original y responde de inmediato; un pool de
+procesos genera variantes redimensionadas en WebP y JPEG y escribe un
+manifest.json al terminar. Las claves incluyen un id aleatorio por imagen,
+así que cada archivo es inmutable y se puede servir con caché de un año.
+
+El almacenamiento es intercambiable: cualquier objeto con save/read/exists
+(y path para servir archivos locales) sirve como store; por defecto se usa
+LocalImageStore sobre un directorio del host.
+"""
+
+import io
+import json
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# Ancho máximo de cada variante (no se agrandan imágenes pequeñas)
+VARIANTS = {'thumb': 320, 'card': 640, 'large': 1280}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})
+}
+ALLOWED_TYPES = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp', 'image/gif': 'gif'}
+SERVABLE_EXTENSIONS = {'jpg', 'png', 'webp', 'gif'}
+
+KEY_PATTERN = re.compile(r'^[\w-]+(/[\w-]+)*/[\w-]+\.\w+$')
+ORIGINAL_URL_PATTERN = re.compile(r'/api/images/(?P<prefix>activities/[\w-]+/[0-9a-f]{32})/original\.\w+$')
+
+
+class LocalImageStore:
+    """Archivos en un directorio local"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        if not KEY_PATTERN.match(key):
+            raise ValueError(f'Invalid image key: {key}')
+        return os.path.join(self.root, *key.split('/'))
+
+    def save(self, key: str, data: bytes):
+        """Escritura atómica (archivo temporal + rename)"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def read(self, key: str) -> bytes:
+        with open(self.path(key), 'rb') as f:
+            return f.read()
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.path(key))
+
+
+def generate_variants(store, prefix: str, original_key: str) -> dict:
+    """Crear las variantes de una imagen (se ejecuta en un proceso del pool)"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(store.read(original_key))) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        width, height = image.size
+
+        variants = {}
+        for name, max_width in VARIANTS.items():
+            resized = image.copy()
+            resized.thumbnail((max_width, max_width * 4), Image.LANCZOS)
+            variants[name] = {'width': resized.width, 'height': resized.height}
+            for extension, (pil_format, options) in FORMATS.items():
+                output = resized
+                if pil_format == 'JPEG' and output.mode != 'RGB':
+                    background = Image.new('RGB', output.size, (255, 255, 255))
+                    background.paste(output, mask=output.getchannel('A'))
+                    output = background
+                buffer = io.BytesIO()
+                output.save(buffer, pil_format, **options)
+                key = f'{prefix}/{name}.{extension}'
+                store.save(key, buffer.getvalue())
+                variants[name][extension] = key
+
+    manifest = {'original': original_key, 'width': width, 'height': height, 'variants': variants}
+    store.save(f'{prefix}/manifest.json', json.dumps(manifest).encode('utf-8'))
+    return manifest
+
+
+class ThumbnailPipeline:
+    """Pool de procesos para variantes y lectura de manifests listos"""
+
+    def __init__(self, store, workers: int = 2, manifest_cache_size: int = 1000):
+        self.store = store
+        self.workers = workers
+        self.manifest_cache_size = manifest_cache_size
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._manifests = {}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        """Pool creado en el primer uso de cada proceso (tras el fork de gunicorn)"""
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    def submit(self, prefix: str, original_key: str):
+        future = self._executor().submit(generate_variants, self.store, prefix, original_key)
+        future.add_done_callback(lambda f: self._report(prefix, f))
+        return future
+
+    def _report(self, prefix: str, future):
+        error = future.exception()
+        if error is not None:
+            print(f"[ERROR] Error generating image variants for {prefix}: {str(error)}")
+        else:
+            print(f"[OK] Image variants ready: {prefix}")
+
+    def manifest(self, prefix: str):
+        """Manifest de una imagen ya procesada, o None si aún no está lista"""
+        cached = self._manifests.get(prefix)
+        if cached is not None:
+            return cached
+        key = f'{prefix}/manifest.json'
+        if not self.store.exists(key):
+            return None
+        manifest = json.loads(self.store.read(key))
+        with self._lock:
+            if len(self._manifests) >= self.manifest_cache_size:
+                self._manifests.pop(next(iter(self._manifests)))
+            self._manifests[prefix] = manifest
+        return manifest
+
+    def variant_urls(self, image_url: str):
+        """URLs de las variantes de una imagen subida aquí, o None"""
+        match = ORIGINAL_URL_PATTERN.search(image_url or '')
+        if not match:
+            return None
+        manifest = self.manifest(match.group('prefix'))
+        if manifest is None:
+            return None
+        base_url = image_url[:match.start()] + '/api/images/'
+        return {
+            name: {extension: base_url + variant[extension] for extension in FORMATS}
+            for name, variant in manifest['variants'].items()
+        }
@@ -0,0 +1,60 @@
+"""
+Proveedor JSON configurable para Flask.
+
+Si orjson está instalado se usa para serializar respuestas y leer cuerpos
+JSON; si no, se mantiene el proveedor por defecto de Flask. La salida es
+equivalente a la de Flask: claves ordenadas y fechas con el mismo formato
+(RFC 822) gracias a que orjson delega datetime/date/UUID/dataclasses en el
+mismo `default` de Flask. La única diferencia es que los caracteres no ASCII
+se envían en UTF-8 en lugar de como secuencias \\uXXXX.
+
+JSON_PROVIDER: 'auto' (orjson si está disponible), 'orjson' o 'default'.
+"""
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider con codificación y decodificación vía orjson"""
+
+    def _options(self) -> int:
+        options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                   | orjson.OPT_PASSTHROUGH_DATACLASS)
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        return options
+
+    def dumps(self, obj, **kwargs) -> str:
+        # Opciones propias de json.dumps (indent, separators...) solo en modo debug
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self.default, option=self._options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def configure_json(app, provider: str = 'auto') -> str:
+    """Instalar el proveedor pedido; devuelve el nombre del que quedó activo"""
+    provider = (provider or 'auto').lower()
+    if provider == 'orjson' and orjson is None:
+        print("[WARN] JSON_PROVIDER=orjson pero orjson no está instalado; usando el de Flask")
+    if provider in ('auto', 'orjson') and orjson is not None:
+        app.json = OrjsonProvider(app)
+        return 'orjson'
+    app.json = DefaultJSONProvider(app)
+    return 'default'
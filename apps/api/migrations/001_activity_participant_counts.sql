@@ -0,0 +1,60 @@
+-- =============================================================================
+-- Conteo denormalizado de participantes por actividad
+-- =============================================================================
+-- volunteer_activities.approved_count / pending_count se mantienen con un
+-- trigger sobre volunteer_activity_requests (insert, cambio de estado,
+-- cambio de actividad y delete), así la lista de actividades trae los cupos
+-- sin consultar las solicitudes de cada actividad.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+ALTER TABLE volunteer_activities
+    ADD COLUMN IF NOT EXISTS approved_count INTEGER NOT NULL DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS pending_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION adjust_activity_request_counts(p_activity_id volunteer_activities.id%TYPE, p_status TEXT, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    IF p_status = 'approved' THEN
+        UPDATE volunteer_activities
+           SET approved_count = GREATEST(approved_count + p_delta, 0)
+         WHERE id = p_activity_id;
+    ELSIF p_status = 'pending' THEN
+        UPDATE volunteer_activities
+           SET pending_count = GREATEST(pending_count + p_delta, 0)
+         WHERE id = p_activity_id;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION sync_activity_request_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM adjust_activity_request_counts(OLD.activity_id, OLD.status, -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM adjust_activity_request_counts(NEW.activity_id, NEW.status, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS volunteer_activity_requests_counts ON volunteer_activity_requests;
+CREATE TRIGGER volunteer_activity_requests_counts
+    AFTER INSERT OR DELETE OR UPDATE OF status, activity_id ON volunteer_activity_requests
+    FOR EACH ROW EXECUTE FUNCTION sync_activity_request_counts();
+
+-- Recalcular los conteos de las solicitudes existentes
+UPDATE volunteer_activities va
+   SET approved_count = COALESCE(c.approved, 0),
+       pending_count = COALESCE(c.pending, 0)
+  FROM (
+        SELECT va2.id,
+               COUNT(r.id) FILTER (WHERE r.status = 'approved') AS approved,
+               COUNT(r.id) FILTER (WHERE r.status = 'pending') AS pending
+          FROM volunteer_activities va2
+          LEFT JOIN volunteer_activity_requests r ON r.activity_id = va2.id
+         GROUP BY va2.id
+       ) c
+ WHERE c.id = va.id;
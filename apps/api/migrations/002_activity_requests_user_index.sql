@@ -0,0 +1,12 @@
+-- =============================================================================
+-- Índice para "mis solicitudes"
+-- =============================================================================
+-- GET /api/volunteer-activities/my-requests/<user_id> filtra por user_id y
+-- pagina por created_at descendente; con este índice la consulta recorre
+-- solo las filas del usuario, sin importar el tamaño total de la tabla.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente). En tablas grandes
+-- conviene ejecutarlo aparte con CREATE INDEX CONCURRENTLY.
+
+CREATE INDEX IF NOT EXISTS idx_volunteer_activity_requests_user_created
+    ON volunteer_activity_requests (user_id, created_at DESC);
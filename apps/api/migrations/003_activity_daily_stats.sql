@@ -0,0 +1,91 @@
+-- =============================================================================
+-- Rollup diario para analítica de actividades
+-- =============================================================================
+-- activity_daily_stats guarda por día: actividades creadas, solicitudes
+-- recibidas y solicitudes aprobadas/rechazadas (por fecha de revisión).
+-- GET /api/analytics/activities lee solo esta tabla y agrupa por día,
+-- semana o mes, sin recorrer las filas de volunteer_activity_requests.
+--
+-- refresh_activity_daily_stats(desde) recalcula los días >= desde (por
+-- defecto los últimos 2) a partir de las tablas originales usando los
+-- índices de fechas. Aplicar desde el SQL Editor de Supabase (idempotente).
+
+CREATE TABLE IF NOT EXISTS activity_daily_stats (
+    day DATE PRIMARY KEY,
+    activities_created INTEGER NOT NULL DEFAULT 0,
+    requests_created INTEGER NOT NULL DEFAULT 0,
+    requests_approved INTEGER NOT NULL DEFAULT 0,
+    requests_rejected INTEGER NOT NULL DEFAULT 0,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_volunteer_activities_created_at
+    ON volunteer_activities (created_at);
+CREATE INDEX IF NOT EXISTS idx_volunteer_activity_requests_created_at
+    ON volunteer_activity_requests (created_at);
+CREATE INDEX IF NOT EXISTS idx_volunteer_activity_requests_reviewed_at
+    ON volunteer_activity_requests (reviewed_at) WHERE reviewed_at IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION refresh_activity_daily_stats(p_since DATE DEFAULT CURRENT_DATE - 2)
+RETURNS INTEGER AS $$
+DECLARE
+    refreshed INTEGER;
+BEGIN
+    WITH days AS (
+        SELECT generate_series(p_since, CURRENT_DATE, INTERVAL '1 day')::DATE AS day
+    ),
+    activities AS (
+        SELECT created_at::DATE AS day, COUNT(*) AS n
+          FROM volunteer_activities
+         WHERE created_at >= p_since
+         GROUP BY 1
+    ),
+    requests AS (
+        SELECT created_at::DATE AS day, COUNT(*) AS n
+          FROM volunteer_activity_requests
+         WHERE created_at >= p_since
+         GROUP BY 1
+    ),
+    reviews AS (
+        SELECT reviewed_at::DATE AS day,
+               COUNT(*) FILTER (WHERE status = 'approved') AS approved,
+               COUNT(*) FILTER (WHERE status = 'rejected') AS rejected
+          FROM volunteer_activity_requests
+         WHERE reviewed_at >= p_since
+         GROUP BY 1
+    )
+    INSERT INTO activity_daily_stats AS s
+           (day, activities_created, requests_created, requests_approved, requests_rejected, refreshed_at)
+    SELECT d.day,
+           COALESCE(a.n, 0),
+           COALESCE(r.n, 0),
+           COALESCE(v.approved, 0),
+           COALESCE(v.rejected, 0),
+           now()
+      FROM days d
+      LEFT JOIN activities a ON a.day = d.day
+      LEFT JOIN requests r ON r.day = d.day
+      LEFT JOIN reviews v ON v.day = d.day
+    ON CONFLICT (day) DO UPDATE
+       SET activities_created = EXCLUDED.activities_created,
+           requests_created = EXCLUDED.requests_created,
+           requests_approved = EXCLUDED.requests_approved,
+           requests_rejected = EXCLUDED.requests_rejected,
+           refreshed_at = EXCLUDED.refreshed_at;
+
+    GET DIAGNOSTICS refreshed = ROW_COUNT;
+    RETURN refreshed;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Carga inicial del historial completo
+SELECT refresh_activity_daily_stats(
+    COALESCE((SELECT MIN(created_at)::DATE FROM volunteer_activities), CURRENT_DATE)
+);
+
+-- Refresco periódico: obligatorio, sin él la analítica solo muestra la carga
+-- inicial. Sin pg_cron, programar cada 15 minutos fuera de la base:
+--   python maintenance_jobs.py refresh-activity-stats
+-- Con la extensión pg_cron habilitada en Supabase:
+-- SELECT cron.schedule('refresh-activity-daily-stats', '*/15 * * * *',
+--                      $$SELECT refresh_activity_daily_stats()$$);
@@ -0,0 +1,42 @@
+-- =============================================================================
+-- Aprobar / rechazar solicitudes en una sola llamada
+-- =============================================================================
+-- La propiedad de una solicitud está en la actividad (created_by), que
+-- PostgREST no permite usar como filtro de un UPDATE. Esta función hace la
+-- comprobación y el cambio de estado en una sola sentencia y devuelve:
+--   result = 'updated'   (activity_id de la solicitud)
+--   result = 'forbidden' (la solicitud existe pero el revisor no es el creador)
+--   result = 'not_found'
+-- La API la llama con POST /rpc/review_activity_request.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+CREATE OR REPLACE FUNCTION review_activity_request(
+    p_request_id volunteer_activity_requests.id%TYPE,
+    p_reviewer_id volunteer_activities.created_by%TYPE,
+    p_status TEXT
+)
+RETURNS TABLE (result TEXT, activity_id volunteer_activity_requests.activity_id%TYPE) AS $$
+BEGIN
+    IF p_status NOT IN ('approved', 'rejected') THEN
+        RAISE EXCEPTION 'Invalid review status: %', p_status;
+    END IF;
+
+    RETURN QUERY
+    UPDATE volunteer_activity_requests r
+       SET status = p_status,
+           reviewed_at = NOW()
+      FROM volunteer_activities va
+     WHERE r.id = p_request_id
+       AND va.id = r.activity_id
+       AND va.created_by = p_reviewer_id
+    RETURNING 'updated'::TEXT, r.activity_id;
+
+    IF NOT FOUND THEN
+        RETURN QUERY
+        SELECT CASE WHEN r.id IS NULL THEN 'not_found' ELSE 'forbidden' END, r.activity_id
+          FROM (SELECT 1) AS one
+          LEFT JOIN volunteer_activity_requests r ON r.id = p_request_id;
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,12 @@
+-- =============================================================================
+-- Búsqueda de usuarios por google_id
+-- =============================================================================
+-- POST /api/auth/google busca al usuario con WHERE google_id = <sub del token>.
+-- Índice único parcial: cada cuenta de Google se vincula a un solo usuario y
+-- las cuentas CASIRA (google_id NULL) no ocupan espacio en el índice.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_google_id
+    ON users (google_id)
+    WHERE google_id IS NOT NULL;
@@ -0,0 +1,95 @@
+-- =============================================================================
+-- Archivo de actividades terminadas o eliminadas
+-- =============================================================================
+-- archive_volunteer_activities() mueve por lotes a tablas de archivo las
+-- actividades eliminadas (status = 'deleted') hace más de p_deleted_days y
+-- las que terminaron hace más de p_ended_days, junto con sus solicitudes.
+-- Cada llamada mueve como máximo p_batch_size actividades en una sola
+-- transacción y devuelve cuántas movió; maintenance_jobs.py archive-activities
+-- la llama hasta que devuelve menos que el tamaño del lote.
+--
+-- Las tablas de archivo tienen las mismas columnas que las originales más
+-- archived_at; las filas se copian por nombre de columna, así que al agregar
+-- columnas a las originales basta con agregarlas también aquí (en cualquier
+-- posición). GET /api/volunteer-activities/archive las lee.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+CREATE TABLE IF NOT EXISTS volunteer_activities_archive (
+    LIKE volunteer_activities INCLUDING DEFAULTS,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS volunteer_activity_requests_archive (
+    LIKE volunteer_activity_requests INCLUDING DEFAULTS,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (id),
+    CONSTRAINT volunteer_activity_requests_archive_activity_id_fkey
+        FOREIGN KEY (activity_id) REFERENCES volunteer_activities_archive (id)
+);
+
+-- Historial por organizador y por voluntario
+CREATE INDEX IF NOT EXISTS idx_volunteer_activities_archive_created_by
+    ON volunteer_activities_archive (created_by, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_volunteer_activity_requests_archive_activity
+    ON volunteer_activity_requests_archive (activity_id);
+CREATE INDEX IF NOT EXISTS idx_volunteer_activity_requests_archive_user
+    ON volunteer_activity_requests_archive (user_id, created_at DESC);
+
+-- Candidatas a archivar sin recorrer la tabla completa
+CREATE INDEX IF NOT EXISTS idx_volunteer_activities_end_date
+    ON volunteer_activities (end_date);
+CREATE INDEX IF NOT EXISTS idx_volunteer_activities_deleted
+    ON volunteer_activities (created_at) WHERE status = 'deleted';
+
+CREATE OR REPLACE FUNCTION archive_volunteer_activities(
+    p_ended_days INTEGER DEFAULT 90,
+    p_deleted_days INTEGER DEFAULT 7,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    DROP TABLE IF EXISTS archive_batch;
+    CREATE TEMP TABLE archive_batch ON COMMIT DROP AS
+        SELECT id
+          FROM volunteer_activities
+         WHERE (status = 'deleted' AND created_at < now() - make_interval(days => p_deleted_days))
+            OR end_date < now() - make_interval(days => p_ended_days)
+         ORDER BY id
+         LIMIT p_batch_size;
+
+    -- Bloquear el lote para que no cambie mientras se copia
+    PERFORM 1 FROM volunteer_activities WHERE id IN (SELECT id FROM archive_batch) FOR UPDATE;
+
+    -- Copia por nombre de columna: no depende del orden de las columnas
+    INSERT INTO volunteer_activities_archive
+    SELECT (jsonb_populate_record(NULL::volunteer_activities_archive,
+                                  to_jsonb(va) || jsonb_build_object('archived_at', now()))).*
+      FROM volunteer_activities va
+     WHERE va.id IN (SELECT id FROM archive_batch)
+    ON CONFLICT (id) DO NOTHING;
+
+    INSERT INTO volunteer_activity_requests_archive
+    SELECT (jsonb_populate_record(NULL::volunteer_activity_requests_archive,
+                                  to_jsonb(r) || jsonb_build_object('archived_at', now()))).*
+      FROM volunteer_activity_requests r
+     WHERE r.activity_id IN (SELECT id FROM archive_batch)
+    ON CONFLICT (id) DO NOTHING;
+
+    DELETE FROM volunteer_activity_requests
+     WHERE activity_id IN (SELECT id FROM archive_batch);
+
+    DELETE FROM volunteer_activities
+     WHERE id IN (SELECT id FROM archive_batch);
+
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Un lote cada 10 minutos (requiere la extensión pg_cron habilitada en Supabase):
+-- SELECT cron.schedule('archive-volunteer-activities', '*/10 * * * *',
+--                      $$SELECT archive_volunteer_activities()$$);
@@ -0,0 +1,130 @@
+-- =============================================================================
+-- Outbox de notificaciones de solicitudes
+-- =============================================================================
+-- Un trigger sobre volunteer_activity_requests agrega una fila a
+-- notification_outbox en la misma transacción que la escritura:
+--   - solicitud nueva           -> aviso al organizador ('request_created')
+--   - cambio a approved/rejected -> aviso al voluntario ('request_approved' / 'request_rejected')
+-- Los endpoints no hacen ninguna llamada extra y no se pierde un aviso si la
+-- escritura se confirma, ni se envía uno de una escritura revertida.
+--
+-- notification_worker.py reclama lotes con claim_notifications() (FOR UPDATE
+-- SKIP LOCKED, así que varios workers no se pisan), los entrega y marca cada
+-- fila como 'sent', o la reprograma con backoff hasta agotar los intentos
+-- ('failed'). Una fila reclamada cuyo worker murió vuelve a estar disponible
+-- cuando vence locked_until. El resultado de cada lote se guarda con una
+-- sola llamada a release_notifications().
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    recipient_id UUID,
+    recipient_email TEXT,
+    payload JSONB NOT NULL DEFAULT '{}'::JSONB,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'sending', 'sent', 'failed')),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    sent_at TIMESTAMPTZ
+);
+
+-- Solo las filas por entregar; las enviadas no ocupan el índice
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_due
+    ON notification_outbox (next_attempt_at, id) WHERE status IN ('pending', 'sending');
+
+CREATE OR REPLACE FUNCTION enqueue_activity_request_notification()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_activity RECORD;
+    v_kind TEXT;
+    v_recipient volunteer_activities.created_by%TYPE;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        v_kind := 'request_created';
+    ELSIF NEW.status IS DISTINCT FROM OLD.status AND NEW.status IN ('approved', 'rejected') THEN
+        v_kind := 'request_' || NEW.status;
+    ELSE
+        RETURN NULL;
+    END IF;
+
+    SELECT id, title, created_by INTO v_activity
+      FROM volunteer_activities
+     WHERE id = NEW.activity_id;
+
+    v_recipient := CASE WHEN v_kind = 'request_created' THEN v_activity.created_by ELSE NEW.user_id END;
+
+    INSERT INTO notification_outbox (kind, recipient_id, recipient_email, payload)
+    SELECT v_kind,
+           v_recipient,
+           u.email,
+           jsonb_build_object(
+               'request_id', NEW.id,
+               'activity_id', NEW.activity_id,
+               'activity_title', v_activity.title,
+               'volunteer_id', NEW.user_id,
+               'status', NEW.status,
+               'message', NEW.message
+           )
+      FROM (SELECT 1) AS one
+      LEFT JOIN users u ON u.id = v_recipient;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS volunteer_activity_requests_notify ON volunteer_activity_requests;
+CREATE TRIGGER volunteer_activity_requests_notify
+    AFTER INSERT OR UPDATE OF status ON volunteer_activity_requests
+    FOR EACH ROW EXECUTE FUNCTION enqueue_activity_request_notification();
+
+CREATE OR REPLACE FUNCTION claim_notifications(p_limit INTEGER DEFAULT 100, p_lease_seconds INTEGER DEFAULT 60)
+RETURNS SETOF notification_outbox AS $$
+    UPDATE notification_outbox
+       SET status = 'sending',
+           attempts = attempts + 1,
+           locked_until = now() + make_interval(secs => p_lease_seconds)
+     WHERE id IN (
+            SELECT id
+              FROM notification_outbox
+             WHERE (status = 'pending' AND next_attempt_at <= now())
+                OR (status = 'sending' AND locked_until < now())
+             ORDER BY next_attempt_at, id
+             LIMIT p_limit
+               FOR UPDATE SKIP LOCKED
+           )
+    RETURNING *;
+$$ LANGUAGE sql;
+
+-- Resultado de un lote en un solo UPDATE: cada elemento de p_results es
+-- {"id", "attempts", "status", "last_error", "next_attempt_at", "sent_at"}
+-- (los que no vienen quedan como estaban, salvo last_error). Con el webhook
+-- caído el lote falla entero y esto evita una ida y vuelta por notificación.
+--
+-- attempts es el valor que devolvió claim_notifications() y funciona como
+-- token del lease: si el lease venció y otro worker volvió a reclamar la
+-- fila, attempts ya no coincide y la liberación tardía no la toca (no puede
+-- devolver a 'pending' una fila ya enviada). Devuelve cuántas filas liberó.
+CREATE OR REPLACE FUNCTION release_notifications(p_results JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    released INTEGER;
+BEGIN
+    UPDATE notification_outbox o
+       SET status = r.status,
+           last_error = r.last_error,
+           next_attempt_at = COALESCE(r.next_attempt_at, o.next_attempt_at),
+           sent_at = COALESCE(r.sent_at, o.sent_at),
+           locked_until = NULL
+      FROM jsonb_populate_recordset(NULL::notification_outbox, p_results) r
+     WHERE o.id = r.id
+       AND o.status = 'sending'
+       AND o.attempts = r.attempts;
+
+    GET DIAGNOSTICS released = ROW_COUNT;
+    RETURN released;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,74 @@
+-- =============================================================================
+-- Series de actividades recurrentes
+-- =============================================================================
+-- POST /api/volunteer-activities/series inserta todas las ocurrencias de una
+-- serie en un solo INSERT con el mismo series_id y series_index 0..n-1.
+-- Las operaciones sobre la serie (PUT/DELETE .../series/<series_id>) son un
+-- único UPDATE filtrado por series_id, created_by y start_date, así que el
+-- índice parcial cubre el filtro sin ocupar espacio para actividades sueltas.
+--
+-- Las tablas de archivo reciben las mismas columnas. Como ya no quedan en la
+-- misma posición que en volunteer_activities (archived_at va antes), la
+-- función de archivo pasa a copiar actividades y solicitudes por nombre de
+-- columna.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+ALTER TABLE volunteer_activities
+    ADD COLUMN IF NOT EXISTS series_id UUID,
+    ADD COLUMN IF NOT EXISTS series_index INTEGER;
+
+ALTER TABLE volunteer_activities_archive
+    ADD COLUMN IF NOT EXISTS series_id UUID,
+    ADD COLUMN IF NOT EXISTS series_index INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_volunteer_activities_series
+    ON volunteer_activities (series_id, start_date)
+    WHERE series_id IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION archive_volunteer_activities(
+    p_ended_days INTEGER DEFAULT 90,
+    p_deleted_days INTEGER DEFAULT 7,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    DROP TABLE IF EXISTS archive_batch;
+    CREATE TEMP TABLE archive_batch ON COMMIT DROP AS
+        SELECT id
+          FROM volunteer_activities
+         WHERE (status = 'deleted' AND created_at < now() - make_interval(days => p_deleted_days))
+            OR end_date < now() - make_interval(days => p_ended_days)
+         ORDER BY id
+         LIMIT p_batch_size;
+
+    -- Bloquear el lote para que no cambie mientras se copia
+    PERFORM 1 FROM volunteer_activities WHERE id IN (SELECT id FROM archive_batch) FOR UPDATE;
+
+    -- Copia por nombre de columna: no depende del orden de las columnas
+    INSERT INTO volunteer_activities_archive
+    SELECT (jsonb_populate_record(NULL::volunteer_activities_archive,
+                                  to_jsonb(va) || jsonb_build_object('archived_at', now()))).*
+      FROM volunteer_activities va
+     WHERE va.id IN (SELECT id FROM archive_batch)
+    ON CONFLICT (id) DO NOTHING;
+
+    INSERT INTO volunteer_activity_requests_archive
+    SELECT (jsonb_populate_record(NULL::volunteer_activity_requests_archive,
+                                  to_jsonb(r) || jsonb_build_object('archived_at', now()))).*
+      FROM volunteer_activity_requests r
+     WHERE r.activity_id IN (SELECT id FROM archive_batch)
+    ON CONFLICT (id) DO NOTHING;
+
+    DELETE FROM volunteer_activity_requests
+     WHERE activity_id IN (SELECT id FROM archive_batch);
+
+    DELETE FROM volunteer_activities
+     WHERE id IN (SELECT id FROM archive_batch);
+
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,39 @@
+-- =============================================================================
+-- Columna password_hash y escritura por lotes de cambios en users
+-- =============================================================================
+-- login() lee el hash de users.password_hash y, para las cuentas aún no
+-- migradas, del prefijo 'CASIRA_PWD:<hash>|' del bio.
+-- maintenance_jobs.py migrate-casira-pwd lo mueve a la columna.
+--
+-- apply_user_changes() aplica en un solo UPDATE los cambios de una página del
+-- recorrido. Cada hash es distinto, así que agrupar filas con el mismo cambio
+-- no ahorra nada. Un upsert con filas parciales tampoco sirve: choca con los
+-- NOT NULL de users antes de llegar al ON CONFLICT. Cada elemento de p_rows es
+-- {"id": ..., <columna>: <valor>, ...}; solo se tocan las columnas presentes
+-- (bio, password_hash, full_name). Devuelve cuántas filas cambió.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+ALTER TABLE users
+    ADD COLUMN IF NOT EXISTS password_hash TEXT;
+
+CREATE OR REPLACE FUNCTION apply_user_changes(p_rows JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    changed INTEGER;
+BEGIN
+    UPDATE users u
+       SET bio = CASE WHEN c.change ? 'bio' THEN c.change->>'bio' ELSE u.bio END,
+           password_hash = CASE WHEN c.change ? 'password_hash' THEN c.change->>'password_hash' ELSE u.password_hash END,
+           full_name = CASE WHEN c.change ? 'full_name' THEN c.change->>'full_name' ELSE u.full_name END
+      FROM (
+            -- jsonb_populate_record convierte el id al tipo de users.id
+            SELECT value AS change, (jsonb_populate_record(NULL::users, value)).id AS id
+              FROM jsonb_array_elements(p_rows)
+           ) c
+     WHERE u.id = c.id;
+
+    GET DIAGNOSTICS changed = ROW_COUNT;
+    RETURN changed;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,71 @@
+-- =============================================================================
+-- Archivo: plazo desde la eliminación y actividades sin end_date
+-- =============================================================================
+-- Corrige los criterios de archive_volunteer_activities() (migrations/006 y 008):
+--   - las eliminadas se archivaban p_deleted_days después de created_at, así
+--     que una actividad antigua eliminada ayer se archivaba de inmediato. El
+--     soft delete fija updated_at, que ahora marca el inicio del plazo
+--     (created_at para filas eliminadas antes de que se fijara updated_at),
+--   - las actividades sin end_date no se archivaban nunca; ahora terminan en
+--     start_date.
+-- Los índices parciales siguen las mismas expresiones que la función y que
+-- ArchiveJob.count_candidates en maintenance_jobs.py.
+-- Actividades y solicitudes se copian al archivo por nombre de columna.
+--
+-- Aplicar desde el SQL Editor de Supabase (idempotente).
+
+DROP INDEX IF EXISTS idx_volunteer_activities_end_date;
+DROP INDEX IF EXISTS idx_volunteer_activities_deleted;
+
+CREATE INDEX IF NOT EXISTS idx_volunteer_activities_ended
+    ON volunteer_activities ((COALESCE(end_date, start_date)));
+CREATE INDEX IF NOT EXISTS idx_volunteer_activities_deleted_at
+    ON volunteer_activities ((COALESCE(updated_at, created_at))) WHERE status = 'deleted';
+
+CREATE OR REPLACE FUNCTION archive_volunteer_activities(
+    p_ended_days INTEGER DEFAULT 90,
+    p_deleted_days INTEGER DEFAULT 7,
+    p_batch_size INTEGER DEFAULT 500
+)
+RETURNS INTEGER AS $$
+DECLARE
+    moved INTEGER;
+BEGIN
+    DROP TABLE IF EXISTS archive_batch;
+    CREATE TEMP TABLE archive_batch ON COMMIT DROP AS
+        SELECT id
+          FROM volunteer_activities
+         WHERE (status = 'deleted'
+                AND COALESCE(updated_at, created_at) < now() - make_interval(days => p_deleted_days))
+            OR COALESCE(end_date, start_date) < now() - make_interval(days => p_ended_days)
+         ORDER BY id
+         LIMIT p_batch_size;
+
+    -- Bloquear el lote para que no cambie mientras se copia
+    PERFORM 1 FROM volunteer_activities WHERE id IN (SELECT id FROM archive_batch) FOR UPDATE;
+
+    -- Copia por nombre de columna: no depende del orden de las columnas
+    INSERT INTO volunteer_activities_archive
+    SELECT (jsonb_populate_record(NULL::volunteer_activities_archive,
+                                  to_jsonb(va) || jsonb_build_object('archived_at', now()))).*
+      FROM volunteer_activities va
+     WHERE va.id IN (SELECT id FROM archive_batch)
+    ON CONFLICT (id) DO NOTHING;
+
+    INSERT INTO volunteer_activity_requests_archive
+    SELECT (jsonb_populate_record(NULL::volunteer_activity_requests_archive,
+                                  to_jsonb(r) || jsonb_build_object('archived_at', now()))).*
+      FROM volunteer_activity_requests r
+     WHERE r.activity_id IN (SELECT id FROM archive_batch)
+    ON CONFLICT (id) DO NOTHING;
+
+    DELETE FROM volunteer_activity_requests
+     WHERE activity_id IN (SELECT id FROM archive_batch);
+
+    DELETE FROM volunteer_activities
+     WHERE id IN (SELECT id FROM archive_batch);
+
+    GET DIAGNOSTICS moved = ROW_COUNT;
+    RETURN moved;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Perfilado bajo demanda de requests individuales.
+
+Middleware WSGI que activa cProfile solo para las peticiones elegidas:
+  - con la cabecera X-Profile firmada (HMAC-SHA256 de 'timestamp:path' con
+    PROFILE_SECRET, válida durante unos minutos), o
+  - por muestreo aleatorio (PROFILE_SAMPLE_RATE, 0 = desactivado).
+Cada perfil se guarda en formato pstats en PROFILE_DIR y su nombre se devuelve
+en la cabecera X-Profile-File. Las peticiones no elegidas solo pagan una
+lectura de cabecera y, si hay muestreo, un random().
+
+Generar la cabecera para una ruta:
+    PROFILE_SECRET=... python profiler.py sign /api/volunteer-activities
+
+Ver un perfil:
+    python -m pstats data/profiles/<archivo>.prof
+"""
+
+import cProfile
+import hashlib
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+
+
+def sign(secret: str, path: str, timestamp: int = None) -> str:
+    """Valor de la cabecera X-Profile para una ruta"""
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode('utf-8'), f'{timestamp}:{path}'.encode('utf-8'), hashlib.sha256).hexdigest()
+    return f'{timestamp}.{digest}'
+
+
+class RequestProfiler:
+    """Middleware WSGI de perfilado por petición"""
+
+    def __init__(self, wsgi_app, output_dir: str, secret: str = '', sample_rate: float = 0.0,
+                 signature_ttl: int = 300):
+        self.wsgi_app = wsgi_app
+        self.output_dir = output_dir
+        self.secret = secret
+        self.sample_rate = sample_rate
+        self.signature_ttl = signature_ttl
+        # cProfile no admite dos perfiles activos a la vez en el mismo proceso
+        self._busy = threading.Lock()
+        # Contadores compartidos entre los hilos que atienden requests
+        self._stats_lock = threading.Lock()
+        self.written = 0
+        self.skipped_busy = 0
+        self.skipped_streaming = 0
+
+    def _verified(self, header: str, path: str) -> bool:
+        if not self.secret or not header or '.' not in header:
+            return False
+        timestamp, _, digest = header.partition('.')
+        if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > self.signature_ttl:
+            return False
+        return hmac.compare_digest(sign(self.secret, path, int(timestamp)), header)
+
+    def _selected(self, environ) -> bool:
+        header = environ.get('HTTP_X_PROFILE')
+        if header is not None:
+            return self._verified(header, environ.get('PATH_INFO', ''))
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self._selected(environ):
+            return self.wsgi_app(environ, start_response)
+        if not self._busy.acquire(blocking=False):
+            self._count('skipped_busy')
+            return self.wsgi_app(environ, start_response)
+
+        path = environ.get('PATH_INFO', '')
+        name = '{}-{}-{}-{}.prof'.format(
+            time.strftime('%Y%m%dT%H%M%S'),
+            environ.get('REQUEST_METHOD', 'GET'),
+            re.sub(r'[^\w-]+', '_', path).strip('_')[:80] or 'root',
+            uuid.uuid4().hex[:8]
+        )
+
+        streaming = []
+
+        def profiled_start_response(status, headers, exc_info=None):
+            content_type = next((value for key, value in headers if key.lower() == 'content-type'), '')
+            if content_type.startswith('text/event-stream'):
+                # SSE no termina: no se perfila ni se agrega la cabecera
+                streaming.append(True)
+                return start_response(status, headers, exc_info)
+            return start_response(status, headers + [('X-Profile-File', name)], exc_info)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+            try:
+                response = self.wsgi_app(environ, profiled_start_response)
+                if streaming:
+                    # Devolver el stream sin leerlo; el perfil se descarta
+                    self._count('skipped_streaming')
+                    return response
+                # Consumir el cuerpo dentro del perfil para incluir la serialización
+                try:
+                    body = list(response)
+                finally:
+                    if hasattr(response, 'close'):
+                        response.close()
+            finally:
+                profile.disable()
+            self._dump(profile, name)
+        finally:
+            self._busy.release()
+        return body
+
+    def _dump(self, profile, name: str):
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            profile.dump_stats(os.path.join(self.output_dir, name))
+            self._count('written')
+            print(f"[PROFILE] Wrote {name}")
+        except OSError as e:
+            print(f"[ERROR] Error writing profile {name}: {str(e)}")
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                'sample_rate': self.sample_rate,
+                'signed_header_enabled': bool(self.secret),
+                'written': self.written,
+                'skipped_busy': self.skipped_busy,
+                'skipped_streaming': self.skipped_streaming
+            }
+
+
+def main() -> int:
+    if len(sys.argv) != 3 or sys.argv[1] != 'sign':
+        print("Uso: PROFILE_SECRET=... python profiler.py sign <ruta>")
+        return 1
+    secret = os.environ.get('PROFILE_SECRET', '')
+    if not secret:
+        print("[ERROR] PROFILE_SECRET no está definido")
+        return 1
+    print(f"X-Profile: {sign(secret, sys.argv[2])}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Registro de las consultas a Supabase hechas durante cada request.
+
+SupabaseGuard avisa a QueryRecorder de cada llamada (tabla, operación,
+filtros, duración, filas y bytes aproximados de la respuesta). Al terminar el
+request se resume lo registrado y:
+  - se detectan consultas repetidas con la misma forma (misma tabla y mismos
+    filtros con distintos valores), el patrón N+1,
+  - se compara el número de idas y vueltas con el presupuesto de la ruta
+    (endpoint de Flask); al excederlo se registra un aviso o, en modo 'raise',
+    se lanza QueryBudgetExceeded para que los tests fallen,
+  - opcionalmente se añade la cabecera X-Query-Stats con los totales.
+
+Las consultas se asocian al request por contextvars: los hilos que lanzan
+trabajo en nombre del request (StaleWhileRevalidate) copian el contexto y
+sus consultas se cuentan en ese request. Las que ocurren fuera de un request
+(scripts, refrescos que terminan después de la respuesta) no se registran.
+"""
+
+import contextvars
+import json
+import threading
+from collections import Counter
+
+
+class QueryBudgetExceeded(Exception):
+    """Un endpoint hizo más idas y vueltas a Supabase que su presupuesto"""
+
+
+def describe_query(builder) -> dict:
+    """Método, tabla y filtros de un builder de postgrest"""
+    params = builder.params.multi_items()
+    method = getattr(builder.http_method, 'value', builder.http_method)
+    return {
+        'method': method,
+        'table': str(builder.path).rsplit('/', 1)[-1],
+        'filters': [f'{name}={value}' for name, value in params],
+        # Forma de la consulta: nombres de parámetros y operadores, sin valores
+        'shape': (method, str(builder.path),
+                  tuple(sorted((name, value.split('.', 1)[0] if name != 'select' else value)
+                               for name, value in params)))
+    }
+
+
+def response_size(result) -> tuple:
+    """(filas, bytes aproximados) de una respuesta de postgrest"""
+    data = getattr(result, 'data', None)
+    if data is None:
+        return 0, 0
+    rows = len(data) if isinstance(data, list) else 1
+    return rows, len(json.dumps(data, default=str))
+
+
+class QueryRecorder:
+    """Consultas del request en curso (una lista por contexto)"""
+
+    def __init__(self, budgets: dict = None, default_budget: int = None, n_plus_one_threshold: int = 3,
+                 mode: str = 'warn'):
+        self.budgets = budgets or {}
+        self.default_budget = default_budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.mode = mode
+        self._queries = contextvars.ContextVar('query_recorder_queries', default=None)
+        self._lock = threading.Lock()
+        self.over_budget = Counter()
+        self.n_plus_one = Counter()
+
+    def start(self):
+        self._queries.set([])
+
+    def record(self, builder, operation: str, seconds: float, result=None, error: Exception = None,
+               shared: bool = False):
+        queries = self._queries.get()
+        if queries is None:
+            return
+        rows, size = response_size(result) if result is not None else (0, 0)
+        queries.append(dict(describe_query(builder), operation=operation, ms=round(seconds * 1000, 2),
+                            rows=rows, bytes=size, shared=shared,
+                            error=type(error).__name__ if error is not None else None))
+
+    def finish(self, route: str) -> dict:
+        """Resumen del request; None si no se estaba registrando"""
+        queries = self._queries.get()
+        self._queries.set(None)
+        if queries is None:
+            return None
+        # Copia: un refresco en otro hilo puede seguir agregando consultas
+        queries = list(queries)
+
+        shapes = Counter(query['shape'] for query in queries)
+        repeated = [
+            {'table': shape[1].rsplit('/', 1)[-1], 'method': shape[0], 'count': count}
+            for shape, count in shapes.items() if count >= self.n_plus_one_threshold
+        ]
+        budget = self.budgets.get(route, self.default_budget)
+        summary = {
+            'route': route,
+            'calls': len(queries),
+            'ms': round(sum(query['ms'] for query in queries), 2),
+            'rows': sum(query['rows'] for query in queries),
+            'bytes': sum(query['bytes'] for query in queries),
+            'budget': budget,
+            'n_plus_one': repeated,
+            'queries': [{key: value for key, value in query.items() if key != 'shape'} for query in queries]
+        }
+
+        if repeated:
+            with self._lock:
+                self.n_plus_one[route] += 1
+            print(f"[WARN] Possible N+1 in {route}: "
+                  + ', '.join(f"{item['table']} x{item['count']}" for item in repeated))
+        if budget is not None and len(queries) > budget:
+            with self._lock:
+                self.over_budget[route] += 1
+            message = (f"{route} made {len(queries)} Supabase round-trips (budget {budget}): "
+                       + ', '.join(f"{query['method']} {query['table']}" for query in queries))
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(message)
+            print(f"[WARN] {message}")
+        return summary
+
+    @staticmethod
+    def header(summary: dict) -> str:
+        """Valor de la cabecera X-Query-Stats"""
+        value = f"calls={summary['calls']}; ms={summary['ms']}; rows={summary['rows']}; bytes={summary['bytes']}"
+        if summary['budget'] is not None:
+            value += f"; budget={summary['budget']}"
+        if summary['n_plus_one']:
+            value += f"; n_plus_one={len(summary['n_plus_one'])}"
+        return value
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'mode': self.mode,
+                'budgets': dict(self.budgets),
+                'default_budget': self.default_budget,
+                'over_budget': dict(self.over_budget),
+                'n_plus_one': dict(self.n_plus_one)
+            }
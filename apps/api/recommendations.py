@@ -0,0 +1,278 @@
+"""
+Recomendación de actividades de voluntariado.
+
+ActivityIndex mantiene en memoria una matriz de características de las
+actividades activas (texto y ubicación como vectores de tokens con hashing,
+fecha de inicio, cupos) y puntúa todas a la vez con operaciones de numpy:
+
+    score = w_location * coseno(ubicación, ubicaciones del usuario)
+          + w_date * exp(-días entre hoy y el inicio / horizonte) (x 0.5 si ya empezó)
+          + w_capacity * cupos libres / cupo máximo
+          + w_similarity * coseno(texto, actividades que el usuario ya solicitó)
+
+El índice se refresca de forma incremental (solo filas con created_at o
+updated_at posteriores a la última sincronización) y se reconstruye completo
+cada cierto tiempo para recoger cambios que no tocan updated_at, como los
+conteos que mantiene el trigger de migrations/001. Los refrescos corren en
+segundo plano; la reconstrucción se arma aparte y reemplaza al índice de una
+vez. Las actividades que ya empezaron y no tienen end_date no se recomiendan.
+"""
+
+import math
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+TEXT_DIMENSIONS = 512
+LOCATION_DIMENSIONS = 128
+TOKEN_PATTERN = re.compile(r'[a-z0-9]{3,}')
+
+DEFAULT_WEIGHTS = {'location': 0.3, 'date': 0.25, 'capacity': 0.15, 'similarity': 0.3}
+
+
+def tokens(text: str) -> list:
+    """Palabras en minúsculas y sin acentos"""
+    text = unicodedata.normalize('NFKD', (text or '').lower())
+    return TOKEN_PATTERN.findall(text.encode('ascii', 'ignore').decode('ascii'))
+
+
+def hashed_vector(words: list, dimensions: int) -> np.ndarray:
+    """Bolsa de palabras con hashing, normalizada (L2)"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in words:
+        vector[zlib.crc32(word.encode('utf-8')) % dimensions] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def parse_timestamp(value) -> float:
+    """Fecha ISO de Supabase a epoch (NaN si falta)"""
+    if not value:
+        return math.nan
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def text_of(activity: dict) -> list:
+    return tokens(' '.join(str(activity.get(field) or '') for field in ('title', 'description', 'detailed_description')))
+
+
+class ActivityIndex:
+    """Matriz de características de las actividades activas, refrescada de forma incremental"""
+
+    COLUMNS = 'id, title, description, detailed_description, location, start_date, end_date, ' \
+              'max_participants, approved_count, status, created_at, updated_at'
+    # Atributos que se intercambian al terminar una reconstrucción completa
+    STATE = ('rows', 'positions', 'watermark', 'text', 'location', 'start', 'end', 'capacity', 'active')
+
+    def __init__(self, fetch_rows, refresh_interval: float = 30, full_refresh_interval: float = 600,
+                 date_horizon_days: float = 30, weights: dict = None):
+        """fetch_rows(since) devuelve las filas cambiadas desde since (todas si es None)"""
+        self.fetch_rows = fetch_rows
+        self.refresh_interval = refresh_interval
+        self.full_refresh_interval = full_refresh_interval
+        self.date_horizon_days = date_horizon_days
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._reset()
+        self._synced_at = 0.0
+        self._full_synced_at = 0.0
+        self.full_refreshes = 0
+        self.incremental_refreshes = 0
+
+    def _reset(self):
+        self.rows = []
+        self.positions = {}
+        self.watermark = None
+        self.text = np.zeros((0, TEXT_DIMENSIONS), dtype=np.float32)
+        self.location = np.zeros((0, LOCATION_DIMENSIONS), dtype=np.float32)
+        self.start = np.zeros(0, dtype=np.float64)
+        self.end = np.zeros(0, dtype=np.float64)
+        self.capacity = np.zeros(0, dtype=np.float32)
+        self.active = np.zeros(0, dtype=bool)
+
+    # -------------------------------------------------------------------------
+    # Refresco
+    # -------------------------------------------------------------------------
+
+    def ensure_fresh(self):
+        """Lanzar un refresco si venció el intervalo
+
+        Solo la primera carga se hace en el hilo del request (no hay índice
+        que servir). Después el refresco corre en un hilo propio y recommend()
+        usa el índice anterior hasta que termina: el request no espera la
+        consulta ni la cuenta en su presupuesto (query_recorder.py).
+        """
+        if time.monotonic() - self._synced_at < self.refresh_interval:
+            return
+        if not self.rows:
+            self.refresh()
+            return
+        if not self._refresh_lock.locked():
+            threading.Thread(target=self._refresh_in_background, name='activity-index-refresh', daemon=True).start()
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"[ERROR] Error refreshing activity index: {str(e)}")
+
+    def refresh(self):
+        """Consultar y aplicar los cambios; solo un hilo consulta a la vez
+
+        La consulta (y en la reconstrucción completa, el armado de las matrices)
+        se hace sin self._lock, así recommend() sigue respondiendo con el
+        índice actual; el lock solo se toma para aplicar o intercambiar.
+        """
+        # Con índice ya cargado no se espera al hilo que está refrescando
+        if not self._refresh_lock.acquire(blocking=not self.rows):
+            return
+        try:
+            now = time.monotonic()
+            if now - self._synced_at < self.refresh_interval:
+                return
+            full = now - self._full_synced_at >= self.full_refresh_interval
+            try:
+                rows = self.fetch_rows(None if full else self.watermark)
+            except Exception as e:
+                if not self.rows:
+                    raise
+                # Seguir con el índice actual y reintentar en el próximo intervalo
+                print(f"[WARN] Error refreshing activity index, using cached features: {str(e)}")
+                self._synced_at = now
+                return
+            if full:
+                staged = ActivityIndex(self.fetch_rows, date_horizon_days=self.date_horizon_days)
+                staged._apply(rows)
+                with self._lock:
+                    for name in self.STATE:
+                        setattr(self, name, getattr(staged, name))
+                self._full_synced_at = now
+                self.full_refreshes += 1
+            else:
+                with self._lock:
+                    self._apply(rows)
+                self.incremental_refreshes += 1
+            self._synced_at = now
+        finally:
+            self._refresh_lock.release()
+
+    def _apply(self, rows: list):
+        """Actualizar en su lugar las filas conocidas y agregar las nuevas en bloque"""
+        new_rows = []
+        for row in rows:
+            stamp = max(str(row.get('updated_at') or ''), str(row.get('created_at') or ''))
+            if stamp and (self.watermark is None or stamp > self.watermark):
+                self.watermark = stamp
+            position = self.positions.get(row['id'])
+            if position is None:
+                if row.get('status') == 'active':
+                    new_rows.append(row)
+                continue
+            self.rows[position] = row
+            self.text[position] = hashed_vector(text_of(row), TEXT_DIMENSIONS)
+            self.location[position] = hashed_vector(tokens(row.get('location')), LOCATION_DIMENSIONS)
+            self.start[position], self.end[position] = parse_timestamp(row.get('start_date')), parse_timestamp(row.get('end_date'))
+            self.capacity[position] = self._capacity(row)
+            self.active[position] = row.get('status') == 'active'
+
+        if not new_rows:
+            return
+        offset = len(self.rows)
+        for i, row in enumerate(new_rows):
+            self.positions[row['id']] = offset + i
+        self.rows.extend(new_rows)
+        self.text = np.vstack([self.text, np.array([hashed_vector(text_of(row), TEXT_DIMENSIONS) for row in new_rows])])
+        self.location = np.vstack([self.location, np.array([hashed_vector(tokens(row.get('location')), LOCATION_DIMENSIONS) for row in new_rows])])
+        self.start = np.concatenate([self.start, [parse_timestamp(row.get('start_date')) for row in new_rows]])
+        self.end = np.concatenate([self.end, [parse_timestamp(row.get('end_date')) for row in new_rows]])
+        self.capacity = np.concatenate([self.capacity, np.array([self._capacity(row) for row in new_rows], dtype=np.float32)])
+        self.active = np.concatenate([self.active, np.ones(len(new_rows), dtype=bool)])
+
+    @staticmethod
+    def _capacity(row: dict) -> float:
+        """Fracción de cupos libres (1 si no hay máximo)"""
+        max_participants = row.get('max_participants')
+        if not max_participants:
+            return 1.0
+        return max(0.0, max_participants - (row.get('approved_count') or 0)) / max_participants
+
+    # -------------------------------------------------------------------------
+    # Puntuación
+    # -------------------------------------------------------------------------
+
+    def recommend(self, history: list, location: str = None, exclude=(), limit: int = 20) -> list:
+        """[(actividad, score, desglose)] de mayor a menor
+
+        history: actividades que el usuario ya solicitó (title, description, location...)
+        """
+        self.ensure_fresh()
+        with self._lock:
+            count = len(self.rows)
+            if not count:
+                return []
+
+            now = time.time()
+            # Ya empezadas sin end_date: se tratan como de un día, ya terminadas
+            started = self.start < now
+            ended = (self.end < now) | (np.isnan(self.end) & started)
+            candidates = self.active & (self.capacity > 0) & ~ended
+            for activity_id in exclude:
+                position = self.positions.get(activity_id)
+                if position is not None:
+                    candidates[position] = False
+
+            profile_text = np.zeros(TEXT_DIMENSIONS, dtype=np.float32)
+            profile_location = np.zeros(LOCATION_DIMENSIONS, dtype=np.float32)
+            for activity in history:
+                profile_text += hashed_vector(text_of(activity), TEXT_DIMENSIONS)
+                profile_location += hashed_vector(tokens(activity.get('location')), LOCATION_DIMENSIONS)
+            if location:
+                profile_location += hashed_vector(tokens(location), LOCATION_DIMENSIONS) * max(1, len(history))
+            for vector in (profile_text, profile_location):
+                norm = np.linalg.norm(vector)
+                if norm:
+                    vector /= norm
+
+            # Más puntaje cuanto más cerca está el inicio; las que ya empezaron
+            # (en curso) puntúan la mitad que una que empieza igual de lejos
+            days_away = np.nan_to_num(np.abs(self.start - now) / 86400, nan=self.date_horizon_days)
+            date_score = np.exp(-days_away / self.date_horizon_days) * np.where(started, 0.5, 1.0)
+            scores = {
+                'location': self.location @ profile_location,
+                'date': date_score,
+                'capacity': self.capacity,
+                'similarity': self.text @ profile_text
+            }
+            total = sum(self.weights[name] * values for name, values in scores.items())
+            total = np.where(candidates, total, -np.inf)
+
+            available = int(candidates.sum())
+            k = min(limit, available)
+            if not k:
+                return []
+            top = np.argpartition(-total, k - 1)[:k]
+            top = top[np.argsort(-total[top])]
+            return [
+                (self.rows[i], round(float(total[i]), 4),
+                 {name: round(float(values[i]), 4) for name, values in scores.items()})
+                for i in top
+            ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'activities': int(self.active.sum()),
+                'rows': len(self.rows),
+                'watermark': self.watermark,
+                'full_refreshes': self.full_refreshes,
+                'incremental_refreshes': self.incremental_refreshes
+            }
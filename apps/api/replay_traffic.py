@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Reproducir tráfico capturado contra una instancia de la API
+
+Lee los archivos de TRAFFIC_CAPTURE_DIR (traffic_capture.py), vuelve a enviar
+los requests respetando los intervalos originales divididos por --speed
+(--speed 0 = tan rápido como lo permita --concurrency) y reporta por ruta:
+cantidad, errores, p50/p90/p99/máx de latencia y la p50 registrada en la
+captura para comparar. Con --speed > 0 la latencia se mide desde la hora en
+que cada request debía salir, así que la espera por falta de --concurrency
+cuenta; con --speed 0 no hay hora programada y se mide solo el envío.
+
+Los cuerpos van saneados (contraseñas y tokens redactados, emails con
+seudónimo), así que login y registro ejercitan validación y consultas pero
+no bcrypt. Los POST/PUT/DELETE se reproducen tal cual: usar una instancia de
+pruebas, o --read-only para enviar solo GET.
+
+Uso:
+    python replay_traffic.py data/traffic/*.jsonl.gz --target http://localhost:3000
+    python replay_traffic.py data/traffic/*.jsonl.gz --target https://staging... --speed 5 --concurrency 32
+    python replay_traffic.py data/traffic/*.jsonl.gz --speed 0 --read-only --json report.json
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+
+def load_records(paths: list, read_only: bool = False, routes: set = None) -> list:
+    records = []
+    for path in paths:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if read_only and record['method'] != 'GET':
+                    continue
+                if routes and record.get('route') not in routes:
+                    continue
+                records.append(record)
+    records.sort(key=lambda record: record['ts'])
+    return records
+
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Replayer:
+    """Envía los registros con el ritmo original escalado y mide cada respuesta"""
+
+    def __init__(self, target: str, speed: float = 1.0, concurrency: int = 16, timeout: float = 30):
+        self.target = target.rstrip('/')
+        self.speed = speed
+        self.concurrency = concurrency
+        self.client = httpx.Client(timeout=timeout, limits=httpx.Limits(max_connections=concurrency))
+        self._lock = threading.Lock()
+        self.results = defaultdict(list)
+
+    def send(self, record: dict, scheduled: float = None):
+        """scheduled: instante (perf_counter) en que el request debía salir"""
+        # Medir desde la hora programada: la espera en la cola del pool cuenta
+        # como latencia (sin esto, con --concurrency saturado el p99 se ve mejor)
+        started = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            response = self.client.request(record['method'], self.target + record['path'],
+                                           params=record.get('query') or None, json=record.get('body'))
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.results[f"{record['method']} {record.get('route') or record['path']}"].append(
+                (elapsed_ms, status, record['status'], record['ms']))
+
+    def run(self, records: list) -> float:
+        if not records:
+            return 0.0
+        first_ts = records[0]['ts']
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for i, record in enumerate(records):
+                scheduled = None
+                if self.speed > 0:
+                    scheduled = started + (record['ts'] - first_ts) / self.speed
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                pool.submit(self.send, record, scheduled)
+                if (i + 1) % 1000 == 0:
+                    print(f"[INFO] {i + 1}/{len(records)} requests enviados")
+        return time.perf_counter() - started
+
+    def report(self) -> dict:
+        report = {}
+        for route, samples in sorted(self.results.items()):
+            latencies = [sample[0] for sample in samples]
+            report[route] = {
+                'count': len(samples),
+                'errors': sum(1 for sample in samples if not isinstance(sample[1], int) or sample[1] >= 500),
+                'status_changed': sum(1 for sample in samples if sample[1] != sample[2]),
+                'p50_ms': round(percentile(latencies, 0.5), 1),
+                'p90_ms': round(percentile(latencies, 0.9), 1),
+                'p99_ms': round(percentile(latencies, 0.99), 1),
+                'max_ms': round(max(latencies), 1),
+                'captured_p50_ms': round(statistics.median(sample[3] for sample in samples), 1)
+            }
+        return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Reproducir tráfico capturado y medir latencias por ruta')
+    parser.add_argument('files', nargs='+', help='Archivos traffic-*.jsonl.gz')
+    parser.add_argument('--target', default='http://localhost:3000', help='URL base de la instancia (por defecto http://localhost:3000)')
+    parser.add_argument('--speed', type=float, default=1.0, help='Multiplicador del ritmo original; 0 = máxima velocidad (por defecto 1)')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests simultáneos como máximo (por defecto 16)')
+    parser.add_argument('--read-only', action='store_true', help='Enviar solo GET')
+    parser.add_argument('--route', action='append', help='Limitar a esta ruta de Flask (repetible)')
+    parser.add_argument('--json', help='Guardar el reporte en este archivo JSON')
+    args = parser.parse_args()
+
+    if args.speed < 0 or args.concurrency < 1:
+        print("[ERROR] --speed debe ser >= 0 y --concurrency mayor que 0")
+        return 1
+
+    records = load_records(args.files, read_only=args.read_only, routes=set(args.route or []))
+    if not records:
+        print("[ERROR] No hay requests para reproducir")
+        return 1
+
+    span = records[-1]['ts'] - records[0]['ts']
+    print(f"[INFO] {len(records)} requests capturados en {span:.0f}s, reproduciendo contra {args.target} "
+          f"a {'máxima velocidad' if args.speed == 0 else f'{args.speed:g}x'}")
+
+    replayer = Replayer(args.target, speed=args.speed, concurrency=args.concurrency)
+    elapsed = replayer.run(records)
+    report = replayer.report()
+
+    print(f"\n{'route':<60} {'count':>6} {'err':>5} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'capt p50':>9}")
+    for route, row in report.items():
+        print(f"{route[:60]:<60} {row['count']:>6} {row['errors']:>5} {row['p50_ms']:>8.1f} {row['p90_ms']:>8.1f} "
+              f"{row['p99_ms']:>8.1f} {row['max_ms']:>8.1f} {row['captured_p50_ms']:>9.1f}")
+    print(f"\n[SUCCESS] {len(records)} requests en {elapsed:.1f}s ({len(records) / elapsed if elapsed else 0:.0f} req/s)")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'target': args.target, 'speed': args.speed, 'requests': len(records),
+                       'elapsed_seconds': round(elapsed, 2), 'routes': report}, f, indent=2)
+        print(f"[INFO] Reporte guardado en {args.json}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
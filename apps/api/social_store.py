@@ -0,0 +1,393 @@
+"""
+Almacenamiento compartido para posts, likes y comentarios.
+
+Todos los workers de gunicorn en un mismo host abren el mismo archivo SQLite
+en modo WAL, de modo que un like registrado en un worker es visible para los
+demás. Las escrituras de lectura-modificación usan BEGIN IMMEDIATE para
+serializarse entre procesos e hilos.
+
+Los likes se guardan como conjunto (índice único post/usuario) y los
+contadores se acumulan en memoria por shards y se escriben en lote cada
+pocos cientos de milisegundos, para que miles de toggles por segundo sobre
+un mismo post no compitan por su fila.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL,
+    author_id,
+    author TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL,
+    likes_count INTEGER NOT NULL DEFAULT 0,
+    comments_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_posts_created ON posts(created_at DESC, id DESC);
+
+CREATE TABLE IF NOT EXISTS post_likes (
+    post_id INTEGER NOT NULL REFERENCES posts(id),
+    user_id NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_post_likes_post_user ON post_likes(post_id, user_id);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    post_id INTEGER NOT NULL REFERENCES posts(id),
+    author_id,
+    author TEXT NOT NULL DEFAULT '',
+    content TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    likes_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_comments_post ON comments(post_id, id);
+
+CREATE TABLE IF NOT EXISTS comment_likes (
+    comment_id INTEGER NOT NULL REFERENCES comments(id),
+    user_id NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_comment_likes_comment_user ON comment_likes(comment_id, user_id);
+"""
+
+
+def _today() -> str:
+    return datetime.now().strftime('%Y-%m-%d')
+
+
+class ShardedCounter:
+    """Deltas pendientes por clave, repartidos en shards con su propio lock"""
+
+    def __init__(self, shards: int = 16):
+        self._shards = [(threading.Lock(), {}, {}) for _ in range(shards)]
+
+    def _shard(self, key):
+        return self._shards[hash(key) % len(self._shards)]
+
+    def add(self, key, delta: int):
+        lock, pending, _ = self._shard(key)
+        with lock:
+            pending[key] = pending.get(key, 0) + delta
+
+    def pending(self, key) -> int:
+        """Delta aún no reflejado en la base (pendiente o en escritura)"""
+        lock, pending, in_flight = self._shard(key)
+        with lock:
+            return pending.get(key, 0) + in_flight.get(key, 0)
+
+    def drain(self) -> dict:
+        """Mover los deltas pendientes a 'en escritura' y devolverlos combinados"""
+        drained = {}
+        for lock, pending, in_flight in self._shards:
+            with lock:
+                for key, delta in pending.items():
+                    if delta:
+                        in_flight[key] = in_flight.get(key, 0) + delta
+                        drained[key] = drained.get(key, 0) + delta
+                pending.clear()
+        return drained
+
+    def settle(self, keys):
+        """Olvidar los deltas 'en escritura' una vez confirmados en la base"""
+        for lock, _, in_flight in self._shards:
+            with lock:
+                for key in keys:
+                    in_flight.pop(key, None)
+
+
+class SocialStore:
+    """Posts, comentarios y likes en SQLite (WAL) compartido entre procesos"""
+
+    def __init__(self, path: str, busy_timeout_ms: int = 5000, like_flush_interval: float = 0.5):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.like_flush_interval = like_flush_interval
+        self.post_likes = ShardedCounter()
+        self.comment_likes = ShardedCounter()
+        self._on_flush = None
+        self._flusher = None
+        self._flusher_pid = None
+        self._flush_lock = threading.Lock()
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    # -------------------------------------------------------------------------
+    # Conexiones
+    # -------------------------------------------------------------------------
+
+    def _connection(self) -> sqlite3.Connection:
+        """Una conexión por hilo y por proceso (seguro tras el fork de gunicorn)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000,
+                                   isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _write(self):
+        return _Transaction(self._connection())
+
+    # -------------------------------------------------------------------------
+    # Datos iniciales
+    # -------------------------------------------------------------------------
+
+    def seed(self, posts: list) -> bool:
+        """Cargar los posts de ejemplo una sola vez por archivo de datos"""
+        with self._write() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+                return False
+            for post in posts:
+                conn.execute(
+                    'INSERT INTO posts (id, title, content, author_id, author, created_at, '
+                    'likes_count, comments_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (post['id'], post.get('title', ''), post['content'], post.get('author_id'),
+                     post.get('author', ''), post['created_at'], post.get('likes_count', 0),
+                     post.get('comments_count', 0)))
+                for like in post.get('likes', []):
+                    conn.execute(
+                        'INSERT OR IGNORE INTO post_likes (post_id, user_id, created_at) VALUES (?, ?, ?)',
+                        (post['id'], like['user_id'], like.get('created_at', post['created_at'])))
+                for comment in post.get('comments', []):
+                    conn.execute(
+                        'INSERT INTO comments (id, post_id, author_id, author, content, created_at, '
+                        'likes_count) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (comment['id'], post['id'], comment.get('author_id'), comment.get('author', ''),
+                         comment['content'], comment['created_at'], comment.get('likes_count', 0)))
+            conn.execute("INSERT INTO meta (key, value) VALUES ('seeded', ?)", (datetime.utcnow().isoformat(),))
+            return True
+
+    # -------------------------------------------------------------------------
+    # Lecturas
+    # -------------------------------------------------------------------------
+
+    def list_posts(self) -> list:
+        """Todos los posts con comentarios y likes embebidos (3 consultas en total)"""
+        conn = self._connection()
+        posts = [self._post_row(row) for row in conn.execute(
+            'SELECT * FROM posts ORDER BY created_at DESC, id DESC')]
+        by_id = {post['id']: post for post in posts}
+        for row in conn.execute('SELECT * FROM comments ORDER BY post_id, id'):
+            if row['post_id'] in by_id:
+                by_id[row['post_id']]['comments'].append(self._comment_row(row))
+        for row in conn.execute('SELECT post_id, user_id, created_at FROM post_likes ORDER BY rowid'):
+            if row['post_id'] in by_id:
+                by_id[row['post_id']]['likes'].append({'user_id': row['user_id'], 'created_at': row['created_at']})
+        return posts
+
+    def get_post(self, post_id: int):
+        """Un post con sus comentarios y likes, o None"""
+        conn = self._connection()
+        row = conn.execute('SELECT * FROM posts WHERE id = ?', (post_id,)).fetchone()
+        if row is None:
+            return None
+        post = self._post_row(row)
+        post['comments'] = self.list_comments(post_id)
+        post['likes'] = [{'user_id': r['user_id'], 'created_at': r['created_at']} for r in conn.execute(
+            'SELECT user_id, created_at FROM post_likes WHERE post_id = ? ORDER BY rowid', (post_id,))]
+        return post
+
+    def post_exists(self, post_id: int) -> bool:
+        return self._connection().execute(
+            'SELECT 1 FROM posts WHERE id = ?', (post_id,)).fetchone() is not None
+
+    def list_comments(self, post_id: int) -> list:
+        return [self._comment_row(row) for row in self._connection().execute(
+            'SELECT * FROM comments WHERE post_id = ? ORDER BY id', (post_id,))]
+
+    # -------------------------------------------------------------------------
+    # Escrituras
+    # -------------------------------------------------------------------------
+
+    def create_post(self, title: str, content: str, author_id, author: str) -> dict:
+        with self._write() as conn:
+            cursor = conn.execute(
+                'INSERT INTO posts (title, content, author_id, author, created_at) VALUES (?, ?, ?, ?, ?)',
+                (title, content, author_id, author, _today()))
+            post_id = cursor.lastrowid
+        return self.get_post(post_id)
+
+    def toggle_post_like(self, post_id: int, user_id):
+        """Alternar like; devuelve (liked, likes_count) o None si el post no existe
+
+        Solo se toca el conjunto de likes; el contador se acumula en memoria
+        y se escribe en el siguiente flush.
+        """
+        row = self._connection().execute('SELECT likes_count FROM posts WHERE id = ?', (post_id,)).fetchone()
+        if row is None:
+            return None
+        liked = self._toggle_member('post_likes', 'post_id', post_id, user_id, created_at=_today())
+        delta = 1 if liked else -1
+        self.post_likes.add(post_id, delta)
+        self._ensure_flusher()
+        return liked, max(0, row['likes_count'] + self.post_likes.pending(post_id))
+
+    def add_comment(self, post_id: int, author_id, author: str, content: str):
+        """Agregar comentario; devuelve el comentario o None si el post no existe"""
+        with self._write() as conn:
+            if conn.execute('SELECT 1 FROM posts WHERE id = ?', (post_id,)).fetchone() is None:
+                return None
+            cursor = conn.execute(
+                'INSERT INTO comments (post_id, author_id, author, content, created_at) VALUES (?, ?, ?, ?, ?)',
+                (post_id, author_id, author, content, _today()))
+            conn.execute(
+                'UPDATE posts SET comments_count = (SELECT COUNT(*) FROM comments WHERE post_id = ?) WHERE id = ?',
+                (post_id, post_id))
+            row = conn.execute('SELECT * FROM comments WHERE id = ?', (cursor.lastrowid,)).fetchone()
+            return self._comment_row(row)
+
+    def toggle_comment_like(self, post_id: int, comment_id: int, user_id):
+        """Alternar like en un comentario; (liked, likes_count) o None si no existe"""
+        row = self._connection().execute(
+            'SELECT likes_count FROM comments WHERE id = ? AND post_id = ?', (comment_id, post_id)).fetchone()
+        if row is None:
+            return None
+        liked = self._toggle_member('comment_likes', 'comment_id', comment_id, user_id)
+        self.comment_likes.add(comment_id, 1 if liked else -1)
+        self._ensure_flusher()
+        return liked, max(0, row['likes_count'] + self.comment_likes.pending(comment_id))
+
+    def _toggle_member(self, table: str, column: str, key: int, user_id, created_at: str = None) -> bool:
+        """Quitar o agregar (key, user_id) en el conjunto; True si quedó agregado"""
+        with self._write() as conn:
+            removed = conn.execute(f'DELETE FROM {table} WHERE {column} = ? AND user_id = ?', (key, user_id)).rowcount
+            if removed:
+                return False
+            if created_at is None:
+                conn.execute(f'INSERT INTO {table} ({column}, user_id) VALUES (?, ?)', (key, user_id))
+            else:
+                conn.execute(f'INSERT INTO {table} ({column}, user_id, created_at) VALUES (?, ?, ?)',
+                             (key, user_id, created_at))
+            return True
+
+    # -------------------------------------------------------------------------
+    # Contadores de likes (coalescidos)
+    # -------------------------------------------------------------------------
+
+    def on_like_flush(self, callback):
+        """Registrar callback(post_counts, comment_counts) tras cada flush con cambios"""
+        self._on_flush = callback
+
+    def flush_likes(self):
+        """Escribir en un solo lote los deltas acumulados; devuelve los conteos nuevos"""
+        with self._flush_lock:
+            post_deltas = self.post_likes.drain()
+            comment_deltas = self.comment_likes.drain()
+            if not post_deltas and not comment_deltas:
+                return {}, {}
+            try:
+                with self._write() as conn:
+                    post_counts = self._apply_deltas(conn, 'posts', 'id', post_deltas)
+                    comment_counts = self._apply_deltas(conn, 'comments', 'post_id', comment_deltas)
+            except sqlite3.Error:
+                # Devolver los deltas para reintentarlos en el próximo flush
+                for post_id, delta in post_deltas.items():
+                    self.post_likes.add(post_id, delta)
+                for comment_id, delta in comment_deltas.items():
+                    self.comment_likes.add(comment_id, delta)
+                raise
+            finally:
+                self.post_likes.settle(post_deltas)
+                self.comment_likes.settle(comment_deltas)
+        if self._on_flush is not None:
+            self._on_flush(post_counts, comment_counts)
+        return post_counts, comment_counts
+
+    @staticmethod
+    def _apply_deltas(conn, table: str, post_column: str, deltas: dict) -> dict:
+        """Aplicar deltas; devuelve {id: {'post_id', 'likes_count'}} con los valores nuevos"""
+        conn.executemany(f'UPDATE {table} SET likes_count = MAX(0, likes_count + ?) WHERE id = ?',
+                         [(delta, key) for key, delta in deltas.items()])
+        counts = {}
+        for key in deltas:
+            row = conn.execute(f'SELECT {post_column}, likes_count FROM {table} WHERE id = ?', (key,)).fetchone()
+            if row is not None:
+                counts[key] = {'post_id': row[0], 'likes_count': row[1]}
+        return counts
+
+    def _ensure_flusher(self):
+        """Un hilo de flush por proceso, creado en el primer toggle"""
+        if self._flusher_pid == os.getpid() and self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._flush_lock:
+            if self._flusher_pid == os.getpid() and self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name='like-flusher', daemon=True)
+            self._flusher.start()
+            atexit.register(self.flush_likes)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.like_flush_interval)
+            try:
+                self.flush_likes()
+            except Exception as e:
+                print(f"[ERROR] Like flush error: {str(e)}")
+
+    # -------------------------------------------------------------------------
+    # Serialización
+    # -------------------------------------------------------------------------
+
+    def _post_row(self, row) -> dict:
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'content': row['content'],
+            'author_id': row['author_id'],
+            'author': row['author'],
+            'created_at': row['created_at'],
+            'likes_count': max(0, row['likes_count'] + self.post_likes.pending(row['id'])),
+            'comments_count': row['comments_count'],
+            'comments': [],
+            'likes': []
+        }
+
+    def _comment_row(self, row) -> dict:
+        return {
+            'id': row['id'],
+            'post_id': row['post_id'],
+            'author_id': row['author_id'],
+            'author': row['author'],
+            'content': row['content'],
+            'created_at': row['created_at'],
+            'likes_count': max(0, row['likes_count'] + self.comment_likes.pending(row['id']))
+        }
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT/ROLLBACK sobre una conexión en modo autocommit"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute('COMMIT')
+        else:
+            self.conn.execute('ROLLBACK')
+        return False
@@ -0,0 +1,112 @@
+"""
+Último valor bueno conocido para endpoints de lectura.
+
+En operación normal cada lectura va al backend y guarda su resultado. Si el
+backend falla, tarda más que el tiempo de espera suave o el circuit breaker
+está abierto, se devuelve el último resultado guardado marcado como 'stale'
+y la consulta se termina (o se reintenta) en segundo plano para actualizarlo
+cuando el backend se recupere.
+
+Cada lectura con valor guardado espera su consulta en el pool con el tiempo
+de espera suave, así que el pool debe tener al menos tantos hilos como
+requests simultáneos atiende el proceso: si no, las consultas hacen cola en
+el pool, vencen la espera y se sirve 'stale' con el backend sano.
+"""
+
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class StaleWhileRevalidate:
+    """Almacén LRU acotado de respuestas con refresco en segundo plano"""
+
+    def __init__(self, max_entries: int = 500, soft_timeout: float = 1.5,
+                 max_stale_seconds: float = 86400, workers: int = 32, is_available=None):
+        self.max_entries = max_entries
+        self.soft_timeout = soft_timeout
+        self.max_stale_seconds = max_stale_seconds
+        self.is_available = is_available or (lambda: True)
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='swr-refresh')
+        self.workers = workers
+        self.stale_served = 0
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] > self.max_stale_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key, fetch):
+        """Consulta en segundo plano; una sola en curso por clave"""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future
+            # Copiar el contexto para que las consultas cuenten en el request (query_recorder.py)
+            future = self._pool.submit(contextvars.copy_context().run, self._run, key, fetch)
+            self._inflight[key] = future
+            return future
+
+    def _run(self, key, fetch):
+        try:
+            value = fetch()
+            self._store(key, value)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def get(self, key, fetch):
+        """Devuelve (valor, 'fresh' | 'stale'); propaga el error si no hay nada guardado"""
+        entry = self._lookup(key)
+
+        if entry is None:
+            value = fetch()
+            self._store(key, value)
+            return value, 'fresh'
+
+        if not self.is_available():
+            # Backend marcado como caído: servir lo guardado y reintentar más tarde
+            self._serve_stale()
+            return entry[1], 'stale'
+
+        future = self._refresh(key, fetch)
+        try:
+            return future.result(timeout=self.soft_timeout), 'fresh'
+        except FutureTimeout:
+            print(f"[WARN] Backend lento para '{key}', sirviendo respuesta guardada")
+        except Exception as e:
+            print(f"[WARN] Backend con error para '{key}' ({str(e)}), sirviendo respuesta guardada")
+        self._serve_stale()
+        return entry[1], 'stale'
+
+    def _serve_stale(self):
+        with self._lock:
+            self.stale_served += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'workers': self.workers,
+                'refreshing': len(self._inflight),
+                'stale_served': self.stale_served
+            }
@@ -0,0 +1,302 @@
+"""
+Protección alrededor de las llamadas a Supabase (PostgREST).
+
+Todas las consultas pasan por SupabaseGuard.table(...) o .rpc(...), que:
+  - usa un cliente con timeout de lectura o de escritura según la operación,
+  - reintenta solo las lecturas (select) ante errores transitorios, con
+    backoff exponencial y jitter,
+  - consulta un circuit breaker que falla de inmediato cuando la tasa de
+    errores reciente supera el umbral, para que los workers no se queden
+    bloqueados esperando a un backend caído,
+  - agrupa lecturas idénticas concurrentes (single-flight): mientras una
+    consulta está en curso, las demás iguales esperan y reciben el mismo
+    resultado ya decodificado, que no debe modificarse,
+  - informa cada llamada al recorder opcional (ver query_recorder.py).
+"""
+
+import random
+import threading
+import time
+from collections import Counter, deque
+
+import httpx
+from postgrest.exceptions import APIError
+
+READ_METHODS = {'select'}
+
+
+class CircuitOpenError(Exception):
+    """El circuit breaker está abierto; la llamada no se intentó"""
+
+
+def is_transient(error: Exception) -> bool:
+    """Errores que indican un backend lento o caído (no errores de la consulta)"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, APIError):
+        code = str(error.code or '')
+        # HTTP 5xx, clases 53/57/58 de Postgres y PGRST00x (sin conexión a la base)
+        return code.startswith('5') or code.startswith('PGRST00')
+    return False
+
+
+def query_key(builder) -> tuple:
+    """Clave normalizada de una consulta: método, tabla y parámetros ordenados"""
+    params = tuple(sorted(builder.params.multi_items()))
+    headers = tuple((name, builder.headers.get(name)) for name in ('Accept', 'Prefer', 'Range')
+                    if builder.headers.get(name))
+    return builder.http_method, builder.path, params, headers
+
+
+class SingleFlight:
+    """Una sola ejecución en curso por clave; los demás llamadores la esperan"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Devuelve (resultado, compartido) o propaga el error del líder"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CircuitBreaker:
+    """Breaker por tasa de errores en una ventana deslizante"""
+
+    def __init__(self, name: str, error_rate: float = 0.5, min_calls: int = 10,
+                 window_seconds: float = 30, cooldown_seconds: float = 15):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._lock = threading.Lock()
+        self._outcomes = deque()
+        self._state = 'closed'
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._times_opened = 0
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def allow(self) -> bool:
+        """¿Se puede intentar una llamada? En half-open solo pasa una de prueba"""
+        with self._lock:
+            if self._state == 'closed':
+                return True
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                self._state = 'half_open'
+                self._probe_in_flight = False
+            if self._state == 'half_open' and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record(self, success: bool):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == 'half_open':
+                self._probe_in_flight = False
+                if success:
+                    self._state = 'closed'
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+
+            self._outcomes.append((now, success))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (self._state == 'closed' and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.error_rate):
+                self._open(now)
+
+    def _open(self, now: float):
+        self._state = 'open'
+        self._opened_at = now
+        self._times_opened += 1
+        print(f"[WARN] Circuit breaker '{self.name}' abierto")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == 'open' and time.monotonic() - self._opened_at >= self.cooldown_seconds:
+                return 'half_open'
+            return self._state
+
+    def snapshot(self) -> dict:
+        state = self.state
+        with self._lock:
+            self._trim(time.monotonic())
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                'name': self.name,
+                'state': state,
+                'window_calls': calls,
+                'window_failures': failures,
+                'window_error_rate': round(failures / calls, 3) if calls else 0.0,
+                'error_rate_threshold': self.error_rate,
+                'times_opened': self._times_opened
+            }
+
+
+class SupabaseGuard:
+    """Punto único de acceso a las tablas de Supabase"""
+
+    def __init__(self, read_client, write_client, breaker: CircuitBreaker,
+                 read_retries: int = 2, backoff_base: float = 0.1, backoff_max: float = 1.0,
+                 recorder=None):
+        self.read_client = read_client
+        self.write_client = write_client
+        self.breaker = breaker
+        self.read_retries = read_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self.counters = Counter()
+        self.single_flight = SingleFlight()
+        self.recorder = recorder
+
+    def table(self, table_name: str) -> '_GuardedTable':
+        return _GuardedTable(self, table_name)
+
+    def rpc(self, function_name: str, params: dict) -> '_GuardedQuery':
+        """Llamar a una función de la base; se trata como escritura (sin reintentos)"""
+        return _GuardedQuery(self, self.write_client.rpc(function_name, params), 'write', f'rpc/{function_name}')
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self.counters[key] += amount
+
+    def execute(self, builder, operation: str, table_name: str):
+        """Ejecutar una consulta y registrarla en el recorder si hay uno"""
+        if self.recorder is None:
+            return self._execute_shared(builder, operation, table_name)[0]
+        started = time.perf_counter()
+        try:
+            result, shared = self._execute_shared(builder, operation, table_name)
+        except Exception as e:
+            self.recorder.record(builder, operation, time.perf_counter() - started, error=e)
+            raise
+        self.recorder.record(builder, operation, time.perf_counter() - started, result=result, shared=shared)
+        return result
+
+    def _execute_shared(self, builder, operation: str, table_name: str) -> tuple:
+        """(resultado, compartido); las lecturas idénticas en curso se comparten"""
+        if operation != 'read':
+            return self._execute(builder, operation, table_name), False
+        result, shared = self.single_flight.do(
+            query_key(builder), lambda: self._execute(builder, operation, table_name))
+        if shared:
+            self._count('coalesced')
+        return result, shared
+
+    def _execute(self, builder, operation: str, table_name: str):
+        """Aplicar breaker y, si es lectura, reintentos"""
+        attempts = 1 + (self.read_retries if operation == 'read' else 0)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                self._count('rejected')
+                raise CircuitOpenError(f"Supabase no disponible (circuit breaker abierto, tabla {table_name})")
+            self._count(f'{operation}_calls')
+            try:
+                result = builder.execute()
+            except Exception as e:
+                transient = is_transient(e)
+                self.breaker.record(not transient)
+                if not transient:
+                    raise
+                self._count(f'{operation}_failures')
+                if attempt + 1 >= attempts:
+                    raise
+                self._count('retries')
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+                continue
+            self.breaker.record(True)
+            return result
+
+    def metrics(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {'breaker': self.breaker.snapshot(), 'calls': counters}
+
+
+class _GuardedTable:
+    """Elige el cliente de lectura o escritura según el primer método usado"""
+
+    def __init__(self, guard: SupabaseGuard, table_name: str):
+        self._guard = guard
+        self._table_name = table_name
+
+    def __getattr__(self, method: str):
+        operation = 'read' if method in READ_METHODS else 'write'
+        client = self._guard.read_client if operation == 'read' else self._guard.write_client
+        builder_method = getattr(client.table(self._table_name), method)
+
+        def start(*args, **kwargs):
+            return _GuardedQuery(self._guard, builder_method(*args, **kwargs), operation, self._table_name)
+        return start
+
+
+class _GuardedQuery:
+    """Envuelve el builder de postgrest; execute() pasa por el guard"""
+
+    def __init__(self, guard: SupabaseGuard, builder, operation: str, table_name: str):
+        self._guard = guard
+        self._builder = builder
+        self._operation = operation
+        self._table_name = table_name
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            # p. ej. la propiedad .not_ devuelve el mismo builder
+            if hasattr(attr, 'execute'):
+                return _GuardedQuery(self._guard, attr, self._operation, self._table_name)
+            return attr
+
+        def chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, 'execute'):
+                return _GuardedQuery(self._guard, result, self._operation, self._table_name)
+            return result
+        return chain
+
+    def execute(self):
+        return self._guard.execute(self._builder, self._operation, self._table_name)
@@ -0,0 +1,164 @@
+"""
+Captura opcional de tráfico real para reproducirlo después.
+
+TrafficRecorder registra cada request (ruta de Flask, método, path, query,
+cuerpo JSON saneado y su forma, status y duración) en archivos JSON Lines
+comprimidos con gzip, uno por proceso. replay_traffic.py los vuelve a enviar
+a otra instancia y reporta la distribución de latencias por ruta.
+
+Saneado: contraseñas, tokens y hashes se reemplazan por '<redacted>', los
+emails por un seudónimo estable (el mismo email produce el mismo seudónimo
+dentro de la captura), las cabeceras no se guardan y de los uploads
+multipart solo queda el tamaño.
+
+La escritura la hace un hilo en segundo plano; el request solo arma el
+registro y lo deja en una cola.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+from flask import g, request
+
+SENSITIVE_KEYS = {'password', 'token', 'password_hash', 'access_token', 'refresh_token', 'secret', 'authorization'}
+EMAIL_KEYS = {'email'}
+MAX_STRING = 500
+
+
+def pseudonym(email: str, salt: str) -> str:
+    digest = hashlib.sha256(f'{salt}:{email.lower().strip()}'.encode('utf-8')).hexdigest()[:12]
+    return f'user-{digest}@example.invalid'
+
+
+def sanitize(value, salt: str, key: str = None):
+    """Copia del valor con datos sensibles reemplazados"""
+    if key is not None and key.lower() in SENSITIVE_KEYS:
+        return '<redacted>'
+    if isinstance(value, dict):
+        return {k: sanitize(v, salt, k) for k, v in value.items()}
+    if isinstance(value, list):
+        # Los valores de query son listas: cada elemento conserva la clave
+        return [sanitize(item, salt, key) for item in value]
+    if isinstance(value, str):
+        if key is not None and key.lower() in EMAIL_KEYS:
+            return pseudonym(value, salt)
+        if value.startswith('CASIRA_PWD:'):
+            return '<redacted>'
+        return value[:MAX_STRING]
+    return value
+
+
+def shape(value):
+    """Estructura del cuerpo: tipos en lugar de valores"""
+    if isinstance(value, dict):
+        return {k: shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shape(value[0])] if value else []
+    return type(value).__name__
+
+
+class TrafficRecorder:
+    """Hooks de Flask que guardan los requests saneados en output_dir"""
+
+    def __init__(self, output_dir: str, sample_rate: float = 1.0, skip_paths=(), flush_interval: float = 1.0):
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.skip_paths = tuple(skip_paths)
+        self.flush_interval = flush_interval
+        # Sal por captura: los seudónimos no se pueden cruzar entre capturas
+        self.salt = os.urandom(8).hex()
+        self._queue = queue.Queue(maxsize=10000)
+        self._writer = None
+        self._writer_pid = None
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.dropped = 0
+
+    def init_app(self, app):
+        app.before_request(self._before)
+        app.after_request(self._after)
+
+    def _before(self):
+        if request.path.startswith(self.skip_paths):
+            return
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+        g.traffic_started = time.perf_counter()
+        # Hora de llegada: replay_traffic.py ordena y programa por ts
+        g.traffic_ts = time.time()
+
+    def _after(self, response):
+        started = g.pop('traffic_started', None)
+        if started is None:
+            return response
+
+        record = {
+            'ts': g.pop('traffic_ts'),
+            'route': request.url_rule.rule if request.url_rule else None,
+            'method': request.method,
+            'path': request.path,
+            'query': sanitize(request.args.to_dict(flat=False), self.salt),
+            'status': response.status_code,
+            'ms': round((time.perf_counter() - started) * 1000, 2)
+        }
+        if request.is_json:
+            body = request.get_json(silent=True)
+            if body is not None:
+                record['body'] = sanitize(body, self.salt)
+                record['shape'] = shape(body)
+        elif request.files:
+            record['upload_bytes'] = request.content_length
+
+        try:
+            self._ensure_writer()
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        return response
+
+    def _ensure_writer(self):
+        """Hilo de escritura creado en el primer uso de cada proceso (tras el fork de gunicorn)"""
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid != os.getpid():
+                self._writer = threading.Thread(target=self._write_loop, name='traffic-writer', daemon=True)
+                self._writer_pid = os.getpid()
+                self._writer.start()
+
+    def _write_loop(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, f"traffic-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.jsonl.gz")
+        while True:
+            records = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while time.monotonic() < deadline:
+                try:
+                    records.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                # Cada lote es un miembro gzip nuevo; gzip los lee como un solo archivo
+                with gzip.open(path, 'at', encoding='utf-8') as f:
+                    for record in records:
+                        f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                self.recorded += len(records)
+            except OSError as e:
+                self.dropped += len(records)
+                print(f"[ERROR] Error writing traffic capture: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            'output_dir': self.output_dir,
+            'sample_rate': self.sample_rate,
+            'queued': self._queue.qsize(),
+            'recorded': self.recorded,
+            'dropped': self.dropped
+        }
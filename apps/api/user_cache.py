@@ -0,0 +1,91 @@
+"""
+Caché de perfiles públicos de usuario por worker.
+
+LRU acotado con vencimiento: se llena al hacer login/registro y al leer un
+perfil que no estaba, y update_profile reemplaza la entrada del worker que
+atiende el cambio. Los demás workers ven el cambio cuando vence su copia
+(ttl), así que ttl acota cuánto puede durar un perfil desactualizado.
+
+Solo guarda la forma pública (public_user): nunca el hash de contraseña ni
+el prefijo CASIRA_PWD: del bio.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def public_user(user: dict, auth_provider: str = None) -> dict:
+    """Perfil que se devuelve al cliente a partir de una fila de users"""
+    # Bio sin password hash (usuarios aún no migrados con migrate-casira-pwd)
+    bio = user.get('bio') or ''
+    if bio.startswith('CASIRA_PWD:'):
+        bio = bio.split('|', 1)[1] if '|' in bio else ''
+
+    return {
+        'id': user['id'],
+        'email': user['email'],
+        'first_name': user['first_name'],
+        'last_name': user['last_name'],
+        'fullName': f"{user['first_name']} {user['last_name']}",
+        'role': user['role'],
+        'bio': bio,
+        'avatar_url': user.get('avatar_url', ''),
+        'created_at': user.get('created_at', ''),
+        'last_login': user.get('last_login', ''),
+        'auth_provider': auth_provider or user.get('provider') or 'casira'
+    }
+
+
+class UserCache:
+    """Perfiles por id con LRU y vencimiento"""
+
+    def __init__(self, max_entries: int = 5000, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        key = str(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, profile: dict):
+        key = str(profile['id'])
+        with self._lock:
+            self._entries[key] = (time.monotonic(), profile)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def get_or_load(self, user_id, load):
+        """Perfil en caché o load(user_id) (None si el usuario no existe)
+
+        Los None no se guardan: un usuario creado después de un 404 se ve en
+        el siguiente request.
+        """
+        profile = self.get(user_id)
+        if profile is None:
+            profile = load(user_id)
+            if profile is not None:
+                self.put(profile)
+        return profile
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}